@@ -0,0 +1,168 @@
+"""Response compression negotiated from the client's Accept-Encoding.
+
+CompressionMiddleware wraps the WSGI app next to ProxyFix and compresses
+buffered responses of a compressible type once they reach a minimum size,
+using brotli or zstd when those packages are installed and gzip otherwise.
+Streamed responses (no Content-Length), ones that already carry a
+Content-Encoding and views decorated with @uncompressed pass through as-is.
+"""
+
+import gzip
+import os
+from functools import wraps
+
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+from app.observability import RESPONSE_COMPRESSED_SIZE_BYTES, RESPONSE_SIZE_LABELS_ENVIRON_KEY
+
+try:
+    import brotli
+except ImportError:  # Optional: brotli is only offered when installed.
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd is only offered when installed.
+    zstandard = None
+
+UNCOMPRESSED_ENVIRON_KEY = "goalixa.uncompressed"
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _gzip(body):
+    return gzip.compress(body, compresslevel=6)
+
+
+def _brotli(body):
+    return brotli.compress(body, quality=5)
+
+
+def _zstd(body):
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+def available_encoders():
+    """Encoders that can be offered, in server preference order."""
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = _brotli
+    if zstandard is not None:
+        encoders["zstd"] = _zstd
+    encoders["gzip"] = _gzip
+    return encoders
+
+
+def uncompressed(view):
+    """Opt a view's responses out of compression."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request.environ[UNCOMPRESSED_ENVIRON_KEY] = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size=1024, encoders=None):
+        self.app = app
+        self.min_size = min_size
+        self.encoders = encoders if encoders is not None else available_encoders()
+
+    def negotiate(self, accept_encoding):
+        """The accepted encoding with the highest q-value; ties go to the server's order."""
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        best = None
+        best_quality = 0
+        for name in self.encoders:
+            quality = accepted.quality(name)
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def _candidate(self, environ, status, headers):
+        """Whether a response could be sent compressed, i.e. varies by Accept-Encoding."""
+        if environ.get(UNCOMPRESSED_ENVIRON_KEY) or environ.get("REQUEST_METHOD") == "HEAD":
+            return False
+        if not status.startswith("2") or status.startswith("204"):
+            return False
+        if "Content-Encoding" in headers or "no-transform" in headers.get("Cache-Control", ""):
+            return False
+        mimetype = headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if not mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+            return False
+        try:
+            content_length = int(headers.get("Content-Length", ""))
+        except ValueError:
+            return False
+        return content_length >= self.min_size
+
+    def __call__(self, environ, start_response):
+        captured = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return _write
+
+        def _write(data):
+            # Flask never uses the legacy write() callable, and its output
+            # could not be placed ahead of a buffered body.
+            raise RuntimeError("write() is not supported behind CompressionMiddleware")
+
+        app_iter = self.app(environ, capture_start_response)
+        status, header_list, exc_info = captured
+        headers = Headers(header_list)
+        if not self._candidate(environ, status, headers):
+            start_response(status, header_list, exc_info)
+            return app_iter
+
+        vary = headers.get("Vary")
+        if not vary:
+            headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            headers["Vary"] = f"{vary}, Accept-Encoding"
+        encoding = self.negotiate(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        try:
+            body = b"".join(app_iter)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        compressed = self.encoders[encoding](body)
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            # The bytes differ per encoding, so a strong ETag no longer holds.
+            headers["ETag"] = f"W/{etag}"
+
+        labels = environ.get(RESPONSE_SIZE_LABELS_ENVIRON_KEY)
+        if labels is not None:
+            RESPONSE_COMPRESSED_SIZE_BYTES.labels(**labels, encoding=encoding).observe(
+                len(compressed)
+            )
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return [compressed]
+
+
+def register_response_compression(app):
+    if os.getenv("RESPONSE_COMPRESSION_ENABLED", "1") != "1":
+        return
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=max(0, int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))),
+    )
@@ -146,7 +146,7 @@ def record_project_operation(operation: str, success: bool = True):
 # ============= Cache Metrics Helpers =============
 
 @contextmanager
-def track_cache_operation(operation: str):
+def track_cache_operation(operation: str, cache: str = "default"):
     """
     Context manager to track cache operation metrics.
 
@@ -165,27 +165,27 @@ def track_cache_operation(operation: str):
     finally:
         duration = time.perf_counter() - start_time
         CACHE_DURATION_SECONDS.labels(operation=operation).observe(duration)
-        CACHE_OPERATIONS_TOTAL.labels(operation=operation, status=status).inc()
+        CACHE_OPERATIONS_TOTAL.labels(cache=cache, operation=operation, status=status).inc()
 
 
-def record_cache_hit():
+def record_cache_hit(cache: str = "default"):
     """Record a cache hit."""
-    CACHE_OPERATIONS_TOTAL.labels(operation="get", status="hit").inc()
+    CACHE_OPERATIONS_TOTAL.labels(cache=cache, operation="get", status="hit").inc()
 
 
-def record_cache_miss():
+def record_cache_miss(cache: str = "default"):
     """Record a cache miss."""
-    CACHE_OPERATIONS_TOTAL.labels(operation="get", status="miss").inc()
+    CACHE_OPERATIONS_TOTAL.labels(cache=cache, operation="get", status="miss").inc()
 
 
-def record_cache_set():
+def record_cache_set(cache: str = "default"):
     """Record a cache set operation."""
-    CACHE_OPERATIONS_TOTAL.labels(operation="set", status="success").inc()
+    CACHE_OPERATIONS_TOTAL.labels(cache=cache, operation="set", status="success").inc()
 
 
-def record_cache_delete():
+def record_cache_delete(cache: str = "default"):
     """Record a cache delete operation."""
-    CACHE_OPERATIONS_TOTAL.labels(operation="delete", status="success").inc()
+    CACHE_OPERATIONS_TOTAL.labels(cache=cache, operation="delete", status="success").inc()
 
 
 # ============= External Service Metrics Helpers =============
@@ -34,6 +34,15 @@ RESPONSE_SIZE_BYTES = Summary(
     ["method", "route", "status_code"]
 )
 
+RESPONSE_COMPRESSED_SIZE_BYTES = Summary(
+    "goalixa_http_response_compressed_size_bytes",
+    "HTTP response size in bytes as sent, for compressed responses.",
+    ["method", "route", "status_code", "encoding"]
+)
+# Where complete_request_tracking leaves the response's size labels, so the
+# compression middleware can record the compressed size under them too.
+RESPONSE_SIZE_LABELS_ENVIRON_KEY = "goalixa.response_size_labels"
+
 REQUEST_EXCEPTIONS_TOTAL = Counter(
     "goalixa_http_request_exceptions_total",
     "Total number of request exceptions.",
@@ -126,7 +135,7 @@ PROJECT_OPERATIONS_TOTAL = Counter(
 CACHE_OPERATIONS_TOTAL = Counter(
     "goalixa_cache_operations_total",
     "Total number of cache operations.",
-    ["operation", "status"],  # operation: hit, miss, set, delete
+    ["cache", "operation", "status"],  # operation: get, set, delete
 )
 
 CACHE_DURATION_SECONDS = Histogram(
@@ -232,11 +241,9 @@ def register_observability(app):
 
         # Track response size
         if response.content_length:
-            RESPONSE_SIZE_BYTES.labels(
-                method=method,
-                route=route,
-                status_code=status_code
-            ).observe(response.content_length)
+            size_labels = {"method": method, "route": route, "status_code": status_code}
+            RESPONSE_SIZE_BYTES.labels(**size_labels).observe(response.content_length)
+            request.environ[RESPONSE_SIZE_LABELS_ENVIRON_KEY] = size_labels
 
         request_id = getattr(g, "request_id", "")
         if request_id:
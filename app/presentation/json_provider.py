@@ -0,0 +1,93 @@
+"""JSON encoding for API responses.
+
+OrjsonProvider encodes with orjson and writes the same JSON as Flask's
+default provider: keys sorted, dates and datetimes as HTTP dates, Decimals
+and UUIDs as strings. Payloads may also hold JSONFragment values, JSON that
+was encoded earlier (and possibly cached) and is spliced into the response
+as-is instead of being encoded again.
+"""
+
+import json
+import os
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: Flask's stdlib-based provider is used instead.
+    orjson = None
+
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson").strip().lower()
+
+
+class JSONFragment:
+    """Already-encoded JSON to embed in a payload without re-encoding it."""
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+
+    @classmethod
+    def encode(cls, value):
+        """Encode value now with the app's provider, for splicing in later."""
+        return cls(current_app.json.dumps(value))
+
+
+class FragmentJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, plus support for JSONFragment values."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, JSONFragment):
+            # The stdlib encoder cannot emit raw text, so decode it once more.
+            return json.loads(o.encoded)
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(FragmentJSONProvider):
+    """Encodes with orjson; calls passing stdlib json options fall back to it."""
+
+    def _option(self, indent=False):
+        # Dates go through default() so they keep the HTTP date format.
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, JSONFragment):
+            return orjson.Fragment(o.encoded)
+        return DefaultJSONProvider.default(o)
+
+    def _encode(self, obj, indent=False):
+        return orjson.dumps(obj, default=self._default, option=self._option(indent))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self._encode(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
+
+
+def register_json_provider(app):
+    # orjson.Fragment needs orjson 3.9 or later.
+    if JSON_PROVIDER == "orjson" and hasattr(orjson, "Fragment"):
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = FragmentJSONProvider(app)
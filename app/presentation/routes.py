@@ -1,11 +1,21 @@
+import os
 from datetime import datetime, timedelta, timezone
+from functools import wraps
 from zoneinfo import ZoneInfo
 
-from flask import jsonify, request
+from flask import g, jsonify, request
 from werkzeug.datastructures import MultiDict
 
 from app.auth_client import auth_required, current_user
+from app.compression import uncompressed
+from app.presentation.json_provider import JSONFragment
 from app.repository.postgres_repository import UserEmailConflictError
+from app.service.cache import TTLCache
+
+
+# "postgres" has the database assemble the task list JSON; "python" builds
+# it from rows here.
+TASKS_PAYLOAD_ENGINE = os.getenv("TASKS_PAYLOAD_ENGINE", "python").strip().lower()
 
 
 def register_routes(app, service):
@@ -18,7 +28,16 @@ def register_routes(app, service):
         "reopen",
     }
 
+    # Encoded label lists keyed by (user, data_version). Every write moves the
+    # version on, so entries never need invalidating.
+    labels_fragments = TTLCache(
+        "labels_fragment",
+        max_size=int(os.getenv("LABELS_FRAGMENT_CACHE_MAX_SIZE", "10000")),
+        ttl_seconds=300,
+    )
+
     @app.route("/health", methods=["GET"])
+    @uncompressed
     def health():
         """Health check endpoint for Kubernetes probes (no auth required).. """
         return jsonify({"status": "ok"}), 200
@@ -28,7 +47,7 @@ def register_routes(app, service):
         if current_user.is_authenticated:
             service.repository.set_user_id(current_user.id)
             try:
-                service.ensure_user_setup(current_user.email)
+                service.ensure_user_setup(current_user.email, user_id=current_user.id)
             except UserEmailConflictError:
                 app.logger.warning(
                     "user setup blocked by email conflict",
@@ -38,21 +57,33 @@ def register_routes(app, service):
             return
         service.repository.set_user_id(None)
 
-    @app.before_request
-    def auto_complete_overdue_timers():
-        # Keep timer state consistent even when a user returns after token/session gaps.,.
-        if request.path == "/health":
-            return
-        if not current_user.is_authenticated:
-            return
-        try:
-            service.complete_overdue_timers(max_duration_seconds=1500)
-        except Exception as e:
-            app.logger.error(
-                "Failed to complete overdue timers",
-                exc_info=True,
-                extra={"user_id": current_user.id, "error": str(e)}
-            )
+    def data_versioned(view=None, *, rolling_window=False):
+        """Answer a GET with 304 when the client's weak ETag is still current.
+
+        Checked before the view runs, so an unchanged payload is never built.
+        Views whose payload has rolling 24h totals pass rolling_window=True.
+        """
+        if view is None:
+            return lambda view: data_versioned(view, rolling_window=rolling_window)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = service.data_etag(rolling_window=rolling_window)
+            if etag is None:
+                return view(*args, **kwargs)
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                generation = g.get("write_generation", 0)
+                response = app.make_response(view(*args, **kwargs))
+                # A view that wrote has moved past the version read above.
+                if response.status_code != 200 or g.get("write_generation", 0) != generation:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
 
     def parse_iso(value):
         if not value:
@@ -156,33 +187,33 @@ def register_routes(app, service):
             task_ids.append(task_id)
         return task_ids
 
-    def _run_task_action(task_id, action):
-        if action == "start":
-            service.start_task(task_id)
-            return
-        if action == "stop":
-            service.stop_task(task_id)
-            return
-        if action == "delete":
-            service.delete_task(task_id)
-            return
-        if action == "daily-check":
-            service.set_task_daily_check(task_id, True)
-            return
-        if action == "complete":
-            service.set_task_status(task_id, "completed")
-            return
-        if action == "reopen":
-            service.set_task_status(task_id, "active")
-
     def _run_bulk_task_action(task_ids, action):
         normalized_action = (action or "").strip().lower()
         if normalized_action not in BULK_TASK_ACTIONS:
             return False
-        for task_id in task_ids:
-            _run_task_action(task_id, normalized_action)
+        if normalized_action == "start":
+            service.start_tasks(task_ids)
+        elif normalized_action == "stop":
+            service.stop_tasks(task_ids)
+        elif normalized_action == "delete":
+            service.delete_tasks(task_ids)
+        elif normalized_action == "daily-check":
+            service.set_tasks_daily_check(task_ids, True)
+        elif normalized_action == "complete":
+            service.set_tasks_status(task_ids, "completed")
+        elif normalized_action == "reopen":
+            service.set_tasks_status(task_ids, "active")
         return True
 
+    def _labels_fragment():
+        # Read the version first: labels fetched after it are at least as new.
+        key = (g.get("repository_user_id"), service.data_version())
+        fragment = labels_fragments.get(key)
+        if fragment is None:
+            fragment = JSONFragment.encode(service.list_labels())
+            labels_fragments.set(key, fragment)
+        return fragment
+
     def _serialize_task(task):
         return {
             "id": task["id"],
@@ -216,6 +247,38 @@ def register_routes(app, service):
             ],
         }
 
+    def _tasks_response():
+        if TASKS_PAYLOAD_ENGINE == "postgres":
+            return app.response_class(
+                service.tasks_payload_json(), mimetype="application/json"
+            )
+        return jsonify(_build_tasks_payload())
+
+    def _wants_task_delta():
+        return (
+            _coerce_bool(request.args.get("delta"))
+            or request.headers.get("X-Response-Mode", "").strip().lower() == "delta"
+        )
+
+    def _build_task_delta_payload(task_ids):
+        """Only the tasks a mutation touched, for clients that patch their list.
+
+        Ids that no longer resolve to one of the user's tasks (e.g. deleted
+        ones) are listed in removed_task_ids.
+        """
+        tasks = service.list_tasks_by_ids(task_ids)
+        found_ids = {task["id"] for task in tasks}
+        return {
+            "tasks": [_serialize_task(task) for task in tasks],
+            "removed_task_ids": [task_id for task_id in task_ids if task_id not in found_ids],
+            "data_version": service.data_version(),
+        }
+
+    def _task_mutation_response(task_ids):
+        if _wants_task_delta():
+            return jsonify(_build_task_delta_payload(task_ids))
+        return _tasks_response()
+
     def _build_timer_dashboard_payload():
         start = request.args.get("start")
         end = request.args.get("end")
@@ -275,7 +338,7 @@ def register_routes(app, service):
             "task_rows": task_rows,
             "today_date": today.isoformat(),
             "projects": service.list_projects(),
-            "labels": service.list_labels(),
+            "labels": _labels_fragment(),
         }
 
     def _build_planner_payload():
@@ -329,7 +392,7 @@ def register_routes(app, service):
             "weekly_range_label": f"{week_start.strftime('%b %d')} - {week_end.strftime('%b %d')}",
             "projects": service.list_projects(),
             "tasks": service.list_tasks(),
-            "labels": service.list_labels(),
+            "labels": _labels_fragment(),
         }
 
     def _build_weekly_goals_payload():
@@ -350,11 +413,9 @@ def register_routes(app, service):
             week_start = week_start_date.isoformat()
             week_end = week_end_date.isoformat()
 
-        weekly_current = service.list_weekly_goals(
-            week_start=week_start,
-            week_end=week_end,
+        weekly_current, weekly_all = service.list_weekly_goals_with_current(
+            week_start, week_end
         )
-        weekly_all = service.list_weekly_goals()
         return {
             "weekly_goals_current": weekly_current,
             "weekly_goals_all": weekly_all,
@@ -362,7 +423,7 @@ def register_routes(app, service):
             "week_start": week_start,
             "week_end": week_end,
             "long_term_goals": service.list_goals(),
-            "labels": service.list_labels(),
+            "labels": _labels_fragment(),
         }
 
     def _build_reminders_payload():
@@ -388,7 +449,7 @@ def register_routes(app, service):
         }
 
     def _build_labels_payload():
-        return {"labels": service.list_labels()}
+        return {"labels": _labels_fragment()}
 
     def _timezone_options():
         return [
@@ -419,6 +480,7 @@ def register_routes(app, service):
 
     @app.route("/api/settings/notifications", methods=["GET"])
     @auth_required()
+    @data_versioned
     def get_notification_settings():
         return jsonify(service.get_notification_settings())
 
@@ -433,11 +495,13 @@ def register_routes(app, service):
 
     @app.route("/api/timer/dashboard", methods=["GET"])
     @auth_required()
+    @data_versioned(rolling_window=True)
     def timer_dashboard_api():
         return jsonify(_build_timer_dashboard_payload())
 
     @app.route("/api/calendar/board", methods=["GET"])
     @auth_required()
+    @data_versioned(rolling_window=True)
     def calendar_board_api():
         projects = service.list_projects()
         tasks = [
@@ -478,6 +542,7 @@ def register_routes(app, service):
 
     @app.route("/api/planner", methods=["GET"])
     @auth_required()
+    @data_versioned
     def planner_api():
         return jsonify(_build_planner_payload())
 
@@ -504,6 +569,7 @@ def register_routes(app, service):
 
     @app.route("/api/habits", methods=["GET"])
     @auth_required()
+    @data_versioned
     def list_habits_api():
         return jsonify(_build_habits_payload())
 
@@ -555,11 +621,13 @@ def register_routes(app, service):
 
     @app.route("/api/goals", methods=["GET"])
     @auth_required()
+    @data_versioned(rolling_window=True)
     def list_goals_api():
         return jsonify(_build_goals_payload())
 
     @app.route("/api/goals/<int:goal_id>", methods=["GET"])
     @auth_required()
+    @data_versioned(rolling_window=True)
     def goal_detail_api(goal_id):
         goal = service.get_goal(goal_id)
         if not goal:
@@ -569,7 +637,7 @@ def register_routes(app, service):
                 "goal": goal,
                 "projects": service.list_projects(),
                 "tasks": service.list_tasks(),
-                "labels": service.list_labels(),
+                "labels": _labels_fragment(),
             }
         )
 
@@ -639,6 +707,7 @@ def register_routes(app, service):
 
     @app.route("/api/weekly-goals", methods=["GET"])
     @auth_required()
+    @data_versioned
     def weekly_goals_api():
         return jsonify(_build_weekly_goals_payload())
 
@@ -712,6 +781,7 @@ def register_routes(app, service):
 
     @app.route("/api/labels", methods=["GET"])
     @auth_required()
+    @data_versioned
     def list_labels_api():
         return jsonify(_build_labels_payload())
 
@@ -737,6 +807,7 @@ def register_routes(app, service):
 
     @app.route("/api/account", methods=["GET"])
     @auth_required()
+    @data_versioned
     def account_api():
         return jsonify(_build_account_payload())
 
@@ -768,6 +839,7 @@ def register_routes(app, service):
 
     @app.route("/api/reports/summary", methods=["GET"])
     @auth_required()
+    @data_versioned
     def reports_summary():
         start = request.args.get("start")
         end = request.args.get("end")
@@ -805,19 +877,17 @@ def register_routes(app, service):
         if end_date < start_date:
             start_date, end_date = end_date, start_date
 
-        summary = service.summary_by_range(start_date, end_date)
         group_by = request.args.get("group", "projects")
         if group_by not in {"projects", "labels", "tasks"}:
             group_by = "projects"
 
-        distribution, total_seconds = service.distribution_by_range(
-            start_date,
-            end_date,
-            group_by,
-        )
-        project_totals = service.project_totals_by_range(start_date, end_date)
+        report = service.report_summary_by_range(start_date, end_date, group_by)
+        summary = report["summary"]
+        distribution = report["distribution"]
+        total_seconds = report["total_seconds"]
+        project_totals = report["project_totals"]
         top_project = project_totals[0] if project_totals else None
-        entities = service.report_entities_by_range(start_date, end_date)
+        entities = report["entities"]
         days = max((end_date - start_date).days + 1, 1)
         avg_daily_hours = total_seconds / 3600 / days
 
@@ -836,6 +906,7 @@ def register_routes(app, service):
 
     @app.route("/api/timer/entries", methods=["GET"])
     @auth_required()
+    @data_versioned
     def timer_entries():
         start_raw = request.args.get("start")
         end_raw = request.args.get("end")
@@ -850,8 +921,9 @@ def register_routes(app, service):
 
     @app.route("/api/tasks", methods=["GET"])
     @auth_required()
+    @data_versioned(rolling_window=True)
     def list_tasks_api():
-        return jsonify(_build_tasks_payload())
+        return _tasks_response()
 
     @app.route("/api/tasks", methods=["POST"])
     @auth_required()
@@ -864,25 +936,25 @@ def register_routes(app, service):
             payload.get("goal_id"),
             payload.get("priority", "medium"),
         )
-        return jsonify(_build_tasks_payload())
+        return _tasks_response()
 
     @app.route("/api/tasks/<int:task_id>/start", methods=["POST"])
     @auth_required()
     def start_task_api(task_id):
         service.start_task(task_id)
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/stop", methods=["POST"])
     @auth_required()
     def stop_task_api(task_id):
         service.stop_task(task_id)
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/delete", methods=["POST"])
     @auth_required()
     def delete_task_api(task_id):
         service.delete_task(task_id)
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/daily-check", methods=["POST"])
     @auth_required()
@@ -890,19 +962,19 @@ def register_routes(app, service):
         payload = _json_payload()
         done = payload.get("done", True)
         service.set_task_daily_check(task_id, _coerce_bool(done))
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/complete", methods=["POST"])
     @auth_required()
     def complete_task_api(task_id):
         service.set_task_status(task_id, "completed")
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/reopen", methods=["POST"])
     @auth_required()
     def reopen_task_api(task_id):
         service.set_task_status(task_id, "active")
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/bulk", methods=["POST"])
     @auth_required()
@@ -910,10 +982,10 @@ def register_routes(app, service):
         payload = _json_payload()
         task_ids = _parse_task_ids(payload.get("task_ids", []))
         if not task_ids:
-            return jsonify(_build_tasks_payload())
+            return _task_mutation_response([])
         if not _run_bulk_task_action(task_ids, payload.get("action", "")):
             return jsonify({"error": "Invalid task action"}), 400
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response(task_ids)
 
     @app.route("/api/tasks/<int:task_id>/edit", methods=["POST"])
     @auth_required()
@@ -935,7 +1007,7 @@ def register_routes(app, service):
             except (TypeError, ValueError):
                 goal_id = None
         service.update_task_details(task_id, name=name, project_id=project_id, priority=priority, label_ids=label_ids, goal_id=goal_id)
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/tasks/<int:task_id>/labels", methods=["POST"])
     @auth_required()
@@ -950,7 +1022,7 @@ def register_routes(app, service):
                     "Failed to add label to task",
                     extra={"task_id": task_id, "label_id": label_id, "error": str(e)}
                 )
-        return jsonify(_build_tasks_payload())
+        return _task_mutation_response([task_id])
 
     @app.route("/api/init", methods=["POST"])
     def init_api():
@@ -960,6 +1032,7 @@ def register_routes(app, service):
 
     @app.route("/api/projects", methods=["GET"])
     @auth_required()
+    @data_versioned
     def list_projects_api():
         projects_list = service.list_projects()
         return jsonify(
@@ -1,12 +1,106 @@
+import logging
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 import psycopg
+from psycopg import pq
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, PoolTimeout
 
 from flask import g, has_app_context
 
+from app.observability import DB_CONNECTION_POOL_SIZE, DB_CONNECTIONS_ACTIVE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MIGRATIONS_LOCK_ID = 7_402_111
+TIMER_SWEEP_LOCK_ID = 7_402_112
+# First key of the per-user advisory lock that guards time_daily_rollups; the
+# second key is the user id.
+DAILY_ROLLUPS_LOCK_ID = 7_402_113
+
+# Pomodoro cap: a running timer never counts for longer than this. Reads apply
+# it to open entries; the timer sweeper closes entries that pass it.
+MAX_TIMER_SECONDS = 1500
+
+# Versioned, run-once schema changes applied by init_db, in order. Each entry
+# maps a version string to the repository method that performs it.
+SCHEMA_MIGRATIONS = [
+    ("0001_time_entries_timestamptz", "_migrate_time_entries_timestamptz"),
+    ("0002_time_entries_range_index", "_migrate_time_entries_range_index"),
+    ("0003_time_entries_single_running", "_migrate_time_entries_single_running"),
+    ("0004_time_entries_user_running_index", "_migrate_time_entries_user_running_index"),
+    ("0005_tasks_closed_seconds", "_migrate_tasks_closed_seconds"),
+    ("0006_user_data_version", "_migrate_user_data_version"),
+    ("0007_time_entries_user_degenerate_index", "_migrate_time_entries_user_degenerate_index"),
+]
+
+# Half-open [started_at, ended_at) span of a time entry; running entries extend
+# to infinity. GREATEST guards against rows whose end precedes their start;
+# such rows (and zero-length ones) get an empty range that overlaps nothing.
+# The expression must match idx_time_entries_user_range exactly for the
+# planner to use it.
+TIME_ENTRY_RANGE_SQL = (
+    "tstzrange({p}started_at, "
+    "GREATEST({p}started_at, COALESCE({p}ended_at, 'infinity'::timestamptz)), '[)')"
+)
+
+
+# time_daily_rollups row holding a day's merged total rather than one task's.
+ROLLUP_DAY_TOTAL_TASK_ID = 0
+
+# Drops the stored rollups of every local day the time entries in {changed}
+# (rows of user_id, started_at, ended_at) can touch. Local dates are never more
+# than a day from the UTC date, so widening by a day on each side avoids
+# resolving each user's timezone.
+INVALIDATE_DAILY_ROLLUPS_SQL = """
+    DELETE FROM time_daily_rollups r
+    USING {changed} c
+    WHERE r.user_id = c.user_id
+      AND r.local_date BETWEEN (c.started_at AT TIME ZONE 'UTC')::date - 1
+                           AND (COALESCE(c.ended_at, NOW()) AT TIME ZONE 'UTC')::date + 1
+"""
+
+
+def _time_entry_overlap_sql(prefix="", use_range=True):
+    """SQL predicate matching entries that overlap a [start, end) window.
+
+    The plain started_at/ended_at comparison alone is fastest for windows
+    near the present, where the btree indexes return little outside the
+    window. For older windows the range overlap is added so the planner can
+    use idx_time_entries_user_range instead. Entries whose end does not
+    follow their start have an empty range, so they are matched on the plain
+    comparison alone, through idx_time_entries_user_degenerate. Bind
+    _time_entry_overlap_params() with the same use_range for it.
+    """
+    sql = (
+        f"{prefix}started_at < %s::timestamptz"
+        f" AND ({prefix}ended_at IS NULL OR {prefix}ended_at > %s::timestamptz)"
+    )
+    if not use_range:
+        return sql
+    return (
+        f"{sql} AND ({TIME_ENTRY_RANGE_SQL.format(p=prefix)}"
+        " && tstzrange(%s::timestamptz, %s::timestamptz, '[)')"
+        f" OR {prefix}ended_at <= {prefix}started_at)"
+    )
+
+
+def _time_entry_overlap_params(start_iso, end_iso, use_range=True):
+    """Parameters for _time_entry_overlap_sql(), in placeholder order."""
+    if not use_range:
+        return (end_iso, start_iso)
+    return (end_iso, start_iso, start_iso, end_iso)
+
+
+def _group_rows(rows, key, fields):
+    """{row[key]: [{field: row[field], ...}, ...]} keeping row order."""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[key], []).append({field: row[field] for field in fields})
+    return grouped
+
 
 class UserEmailConflictError(RuntimeError):
     """Raised when an email is already bound to a different user id."""
@@ -26,6 +120,30 @@ class PostgresTaskRepository:
         self.connect_retry_delay_seconds = max(
             0.1, float(os.getenv("DB_CONNECT_RETRY_DELAY_SECONDS", "1"))
         )
+        self.pool_min_size = max(0, int(os.getenv("DB_POOL_MIN_SIZE", "1")))
+        self.pool_max_size = max(
+            1, self.pool_min_size, int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        )
+        self.pool_max_idle_seconds = max(
+            1.0, float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+        )
+        self.pool_max_lifetime_seconds = max(
+            60.0, float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+        )
+        self.pool_timeout_seconds = max(
+            0.1, float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+        )
+        self.migration_batch_size = max(
+            100, int(os.getenv("DB_MIGRATION_BATCH_SIZE", "5000"))
+        )
+        self.pipeline_enabled = (
+            os.getenv("DB_PIPELINE_ENABLED", "1") == "1" and psycopg.Pipeline.is_supported()
+        )
+        self.recent_window_days = max(
+            0, int(os.getenv("TIME_ENTRY_RECENT_WINDOW_DAYS", "30"))
+        )
+        self._pool = None
+        self._pool_pid = None
 
     def set_user_id(self, user_id):
         resolved = int(user_id) if user_id is not None else None
@@ -33,7 +151,8 @@ class PostgresTaskRepository:
         if has_app_context():
             g.repository_user_id = resolved
 
-    def _current_user_id(self):
+    def current_user_id(self):
+        """The id of the user this request acts for, or None when unset."""
         if has_app_context():
             request_user_id = g.get("repository_user_id")
             if request_user_id is not None:
@@ -41,11 +160,51 @@ class PostgresTaskRepository:
         return self.user_id
 
     def _require_user_id(self):
-        user_id = self._current_user_id()
+        user_id = self.current_user_id()
         if user_id is None:
             raise RuntimeError("User context not set for repository access.")
         return user_id
 
+    def _get_pool(self):
+        # Pools own background threads and sockets, so a forked worker must
+        # never reuse the parent's pool; build a fresh one per process.
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            self._pool = ConnectionPool(
+                self.database_url,
+                kwargs={
+                    "row_factory": dict_row,
+                    "connect_timeout": self.connect_timeout_seconds,
+                },
+                min_size=self.pool_min_size,
+                max_size=self.pool_max_size,
+                max_idle=self.pool_max_idle_seconds,
+                max_lifetime=self.pool_max_lifetime_seconds,
+                timeout=self.pool_timeout_seconds,
+                configure=self._configure_connection,
+                check=ConnectionPool.check_connection,
+                name="goalixa",
+                open=True,
+            )
+            self._pool_pid = pid
+        return self._pool
+
+    @staticmethod
+    def _configure_connection(conn):
+        # Naive timestamps written by the app are UTC; make the session agree
+        # so they round-trip through timestamptz columns unchanged.
+        conn.execute("SET TIME ZONE 'UTC'")
+        conn.commit()
+
+    def _update_pool_metrics(self):
+        pool = self._pool
+        if pool is None:
+            return
+        stats = pool.get_stats()
+        pool_size = stats.get("pool_size", 0)
+        DB_CONNECTION_POOL_SIZE.set(pool_size)
+        DB_CONNECTIONS_ACTIVE.set(max(0, pool_size - stats.get("pool_available", 0)))
+
     def _get_db(self):
         existing = g.get("db")
         if existing is not None and not getattr(existing, "closed", False):
@@ -54,19 +213,64 @@ class PostgresTaskRepository:
         last_error = None
         for attempt in range(1, self.connect_max_retries + 1):
             try:
-                g.db = psycopg.connect(
-                    self.database_url,
-                    row_factory=dict_row,
-                    connect_timeout=self.connect_timeout_seconds,
-                )
+                g.db = self._get_pool().getconn()
+                self._update_pool_metrics()
                 return g.db
-            except psycopg.OperationalError as error:
+            except (psycopg.OperationalError, PoolTimeout) as error:
                 last_error = error
                 if attempt >= self.connect_max_retries:
                     break
                 time.sleep(self.connect_retry_delay_seconds)
         raise last_error
 
+    def _commit(self, db):
+        """Commit a change to user data.
+
+        Bumps the user's data_version in the same transaction, and the
+        request's write generation once committed.
+        """
+        user_id = self.current_user_id()
+        if user_id is not None:
+            db.execute(
+                'UPDATE "user" SET data_version = data_version + 1 WHERE id = %s',
+                (user_id,),
+            )
+        db.commit()
+        self._bump_write_generation()
+
+    def _bump_write_generation(self):
+        # Request-scoped reads (see app.service.request_memo) cached before
+        # this write are not reused after it.
+        if has_app_context():
+            g.write_generation = g.get("write_generation", 0) + 1
+
+    def _lock_daily_rollups(self, db, user_id):
+        """Hold the user's rollup lock, shared, until the transaction ends.
+
+        Taken first by writes that change or remove closed time entries, so
+        save_time_daily_rollups (which takes it exclusively) cannot store
+        totals computed from the entries as they were before such a write.
+        Writes that only close running entries do not need it: reports never
+        store a day that a running entry touches.
+        """
+        db.execute(
+            "SELECT pg_advisory_xact_lock_shared(%s::int, %s::int)",
+            (DAILY_ROLLUPS_LOCK_ID, user_id),
+        )
+
+    def _fetch_pipelined(self, queries):
+        """Run (sql, params) queries and return the rows of each, in order.
+
+        In pipeline mode every query is sent before any result is read, so a
+        batch costs one network round trip instead of one per query.
+        """
+        db = self._get_db()
+        if len(queries) == 1 or not self.pipeline_enabled:
+            return [db.execute(sql, params).fetchall() for sql, params in queries]
+        with db.pipeline():
+            cursors = [db.execute(sql, params) for sql, params in queries]
+        return [cursor.fetchall() for cursor in cursors]
+
     def _get_table_columns(self, table_name):
         cached = self._table_columns_cache.get(table_name)
         if cached is not None:
@@ -114,8 +318,21 @@ class PostgresTaskRepository:
 
     def close_db(self, exception=None):
         db = g.pop("db", None)
-        if db is not None:
+        if db is None:
+            return
+        pool = self._pool
+        if pool is None or self._pool_pid != os.getpid():
             db.close()
+            return
+        if not db.closed and db.info.transaction_status != pq.TransactionStatus.IDLE:
+            # Requests that only read leave a transaction open; end it here so
+            # the pool gets back a clean connection without logging a warning.
+            try:
+                db.rollback()
+            except psycopg.Error:
+                db.close()
+        pool.putconn(db)
+        self._update_pool_metrics()
 
     def advisory_lock(self, lock_id):
         db = self._get_db()
@@ -191,13 +408,25 @@ class PostgresTaskRepository:
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER NOT NULL,
                 task_id INTEGER NOT NULL,
-                started_at TEXT NOT NULL,
-                ended_at TEXT,
+                started_at TIMESTAMPTZ NOT NULL,
+                ended_at TIMESTAMPTZ,
                 FOREIGN KEY (user_id) REFERENCES "user" (id) ON DELETE CASCADE,
                 FOREIGN KEY (task_id) REFERENCES tasks (id)
             )
             """,
             """
+            CREATE TABLE IF NOT EXISTS time_daily_rollups (
+                user_id INTEGER NOT NULL,
+                local_date DATE NOT NULL,
+                task_id INTEGER NOT NULL,
+                seconds INTEGER NOT NULL,
+                last_started_at TIMESTAMPTZ,
+                timezone TEXT NOT NULL,
+                PRIMARY KEY (user_id, local_date, task_id),
+                FOREIGN KEY (user_id) REFERENCES "user" (id) ON DELETE CASCADE
+            )
+            """,
+            """
             CREATE TABLE IF NOT EXISTS task_daily_checks (
                 task_id INTEGER NOT NULL,
                 log_date TEXT NOT NULL,
@@ -407,6 +636,9 @@ class PostgresTaskRepository:
                 "UPDATE weekly_goals SET user_id = %s WHERE user_id IS NULL",
                 (default_user_id,),
             )
+        db.commit()
+
+        self._apply_schema_migrations(db)
 
         # Create performance indexes for frequently queried columns
         # These indexes significantly improve query performance for common operations
@@ -443,12 +675,389 @@ class PostgresTaskRepository:
                 db.execute(index_stmt)
             except Exception as e:
                 # Log but don't fail if index creation fails (might already exist)
-                import logging
-                logger = logging.getLogger(__name__)
                 logger.warning(f"Failed to create index: {e}")
 
         db.commit()
 
+    def _apply_schema_migrations(self, db):
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        db.commit()
+        # Every worker runs init_db on boot; only one may migrate at a time.
+        # Poll rather than block: a session waiting inside pg_advisory_lock
+        # holds a snapshot, which CREATE INDEX CONCURRENTLY would wait on.
+        while not db.execute(
+            "SELECT pg_try_advisory_lock(%s) AS locked", (SCHEMA_MIGRATIONS_LOCK_ID,)
+        ).fetchone()["locked"]:
+            db.commit()
+            time.sleep(self.connect_retry_delay_seconds)
+        db.commit()
+        try:
+            applied = {
+                row["version"]
+                for row in db.execute("SELECT version FROM schema_migrations").fetchall()
+            }
+            db.commit()
+            for version, method_name in SCHEMA_MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info("Applying schema migration %s", version)
+                getattr(self, method_name)(db)
+                db.execute(
+                    "INSERT INTO schema_migrations (version) VALUES (%s)",
+                    (version,),
+                )
+                db.commit()
+                self._table_columns_cache.clear()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.execute("SELECT pg_advisory_unlock(%s)", (SCHEMA_MIGRATIONS_LOCK_ID,))
+            db.commit()
+
+    def _column_data_type(self, db, table_name, column_name):
+        row = db.execute(
+            """
+            SELECT data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s AND column_name = %s
+            """,
+            (table_name, column_name),
+        ).fetchone()
+        return row["data_type"] if row else None
+
+    def _execute_autocommit(self, db, statements):
+        db.commit()
+        db.autocommit = True
+        try:
+            for statement in statements:
+                db.execute(statement)
+        finally:
+            db.autocommit = False
+
+    def _migrate_time_entries_timestamptz(self, db):
+        """Convert time_entries.started_at/ended_at from TEXT to TIMESTAMPTZ.
+
+        Runs online: shadow columns are kept in sync by a trigger while
+        existing rows are backfilled in id-ordered batches, indexes are built
+        concurrently, and only the final column swap takes a brief exclusive
+        lock. Every step is idempotent so an interrupted run can resume.
+        """
+        if self._column_data_type(db, "time_entries", "started_at") != "text":
+            return
+
+        # Stored values are naive UTC ISO strings; honour an explicit offset
+        # when one is present so the result never depends on session timezone.
+        db.execute(
+            r"""
+            CREATE OR REPLACE FUNCTION time_entries_text_to_timestamptz(value TEXT)
+            RETURNS TIMESTAMPTZ
+            LANGUAGE SQL STABLE
+            AS $$
+                SELECT CASE
+                    WHEN value IS NULL OR btrim(value) = '' THEN NULL
+                    WHEN value ~ '\d:\d\d(:\d\d(\.\d+)?)?\s*(Z|[+-]\d\d(:?\d\d)?)$'
+                        THEN value::timestamptz
+                    ELSE value::timestamp AT TIME ZONE 'UTC'
+                END
+            $$
+            """
+        )
+        db.execute(
+            """
+            CREATE OR REPLACE FUNCTION time_entries_sync_timestamptz()
+            RETURNS TRIGGER
+            LANGUAGE plpgsql
+            AS $$
+            BEGIN
+                NEW.started_at_tz := time_entries_text_to_timestamptz(NEW.started_at);
+                NEW.ended_at_tz := time_entries_text_to_timestamptz(NEW.ended_at);
+                RETURN NEW;
+            END
+            $$
+            """
+        )
+        db.execute("ALTER TABLE time_entries ADD COLUMN IF NOT EXISTS started_at_tz TIMESTAMPTZ")
+        db.execute("ALTER TABLE time_entries ADD COLUMN IF NOT EXISTS ended_at_tz TIMESTAMPTZ")
+        db.execute("DROP TRIGGER IF EXISTS time_entries_sync_timestamptz ON time_entries")
+        db.execute(
+            """
+            CREATE TRIGGER time_entries_sync_timestamptz
+            BEFORE INSERT OR UPDATE OF started_at, ended_at ON time_entries
+            FOR EACH ROW EXECUTE FUNCTION time_entries_sync_timestamptz()
+            """
+        )
+        db.commit()
+
+        last_id = 0
+        while True:
+            rows = db.execute(
+                """
+                WITH batch AS (
+                    SELECT id
+                    FROM time_entries
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                )
+                UPDATE time_entries te
+                SET started_at_tz = time_entries_text_to_timestamptz(te.started_at),
+                    ended_at_tz = time_entries_text_to_timestamptz(te.ended_at)
+                FROM batch
+                WHERE te.id = batch.id
+                RETURNING te.id
+                """,
+                (last_id, self.migration_batch_size),
+            ).fetchall()
+            db.commit()
+            if not rows:
+                break
+            last_id = max(row["id"] for row in rows)
+
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_started_at_tz",
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_ended_at_tz",
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_task_ended_tz",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_started_at_tz ON time_entries(started_at_tz)",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_ended_at_tz ON time_entries(ended_at_tz)",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_task_ended_tz ON time_entries(task_id, ended_at_tz)",
+            ],
+        )
+
+        # A validated CHECK lets SET NOT NULL skip its full-table scan below.
+        db.execute(
+            "ALTER TABLE time_entries DROP CONSTRAINT IF EXISTS time_entries_started_at_tz_not_null"
+        )
+        db.execute(
+            """
+            ALTER TABLE time_entries
+            ADD CONSTRAINT time_entries_started_at_tz_not_null
+            CHECK (started_at_tz IS NOT NULL) NOT VALID
+            """
+        )
+        db.commit()
+        db.execute(
+            "ALTER TABLE time_entries VALIDATE CONSTRAINT time_entries_started_at_tz_not_null"
+        )
+        db.commit()
+
+        for attempt in range(1, self.connect_max_retries + 1):
+            try:
+                db.execute("SET LOCAL lock_timeout = '5s'")
+                db.execute("LOCK TABLE time_entries IN ACCESS EXCLUSIVE MODE")
+                break
+            except psycopg.errors.LockNotAvailable:
+                db.rollback()
+                if attempt >= self.connect_max_retries:
+                    raise
+                time.sleep(self.connect_retry_delay_seconds)
+        db.execute("DROP TRIGGER IF EXISTS time_entries_sync_timestamptz ON time_entries")
+        db.execute("ALTER TABLE time_entries DROP COLUMN started_at, DROP COLUMN ended_at")
+        db.execute("ALTER TABLE time_entries RENAME COLUMN started_at_tz TO started_at")
+        db.execute("ALTER TABLE time_entries RENAME COLUMN ended_at_tz TO ended_at")
+        db.execute("ALTER TABLE time_entries ALTER COLUMN started_at SET NOT NULL")
+        db.execute(
+            "ALTER TABLE time_entries DROP CONSTRAINT time_entries_started_at_tz_not_null"
+        )
+        db.execute(
+            "ALTER INDEX idx_time_entries_started_at_tz RENAME TO idx_time_entries_started_at"
+        )
+        db.execute(
+            "ALTER INDEX idx_time_entries_ended_at_tz RENAME TO idx_time_entries_ended_at"
+        )
+        db.execute(
+            "ALTER INDEX idx_time_entries_task_ended_tz RENAME TO idx_time_entries_task_ended"
+        )
+        db.execute("DROP FUNCTION IF EXISTS time_entries_sync_timestamptz()")
+        db.execute("DROP FUNCTION IF EXISTS time_entries_text_to_timestamptz(TEXT)")
+
+    def _migrate_time_entries_range_index(self, db):
+        """Index each user's entries by time span for window overlap queries."""
+        range_sql = TIME_ENTRY_RANGE_SQL.format(p="")
+        try:
+            with db.transaction():
+                db.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            index_columns = f"user_id, {range_sql}"
+        except psycopg.Error as error:
+            # Without btree_gist the integer user_id cannot live in a GiST
+            # index; index the span alone and let user_id filter the matches.
+            logger.warning(
+                "btree_gist unavailable, indexing time entry ranges without user_id: %s",
+                error,
+            )
+            index_columns = range_sql
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_user_range",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_user_range "
+                f"ON time_entries USING gist ({index_columns})",
+            ],
+        )
+
+    def _migrate_time_entries_single_running(self, db):
+        """Back time_entries.id with its sequence and allow one running entry per task."""
+        # Rows used to be inserted with MAX(id) + 1, which never advanced the
+        # SERIAL sequence; move it past the existing ids before relying on it.
+        sequence = db.execute(
+            "SELECT pg_get_serial_sequence('time_entries', 'id') AS name"
+        ).fetchone()["name"]
+        if sequence is None:
+            db.execute("CREATE SEQUENCE IF NOT EXISTS time_entries_id_seq OWNED BY time_entries.id")
+            db.execute(
+                "ALTER TABLE time_entries ALTER COLUMN id SET DEFAULT nextval('time_entries_id_seq')"
+            )
+            sequence = "time_entries_id_seq"
+        db.execute("LOCK TABLE time_entries IN SHARE ROW EXCLUSIVE MODE")
+        db.execute(
+            """
+            SELECT setval(%s::regclass, GREATEST(COALESCE(MAX(id), 0), 1), MAX(id) IS NOT NULL)
+            FROM time_entries
+            """,
+            (sequence,),
+        )
+
+        # Older duplicate timers end where the newest one for the task begins,
+        # which keeps the tracked time the same as before.
+        db.execute(
+            """
+            WITH running AS (
+                SELECT id, started_at,
+                       FIRST_VALUE(started_at) OVER (
+                           PARTITION BY task_id ORDER BY started_at DESC, id DESC
+                       ) AS latest_started_at,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY task_id ORDER BY started_at DESC, id DESC
+                       ) AS position
+                FROM time_entries
+                WHERE ended_at IS NULL
+            )
+            UPDATE time_entries te
+            SET ended_at = GREATEST(running.started_at, running.latest_started_at)
+            FROM running
+            WHERE te.id = running.id AND running.position > 1
+            """
+        )
+        db.commit()
+
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_task_running",
+                "CREATE UNIQUE INDEX CONCURRENTLY idx_time_entries_task_running "
+                "ON time_entries(task_id) WHERE ended_at IS NULL",
+            ],
+        )
+
+    def _migrate_time_entries_user_running_index(self, db):
+        """Index each user's running entries; they are read on nearly every request."""
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_user_running",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_user_running "
+                "ON time_entries(user_id, started_at) WHERE ended_at IS NULL",
+            ],
+        )
+
+    def _migrate_time_entries_user_degenerate_index(self, db):
+        """Index entries whose end does not follow their start.
+
+        Their span is empty, so idx_time_entries_user_range never returns
+        them and window queries look them up here instead.
+        """
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_user_degenerate",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_user_degenerate "
+                "ON time_entries(user_id) WHERE ended_at <= started_at",
+            ],
+        )
+
+    def _migrate_tasks_closed_seconds(self, db):
+        """Keep the total of each task's closed time entries on the task row.
+
+        A trigger adds or removes an entry's duration whenever it is closed,
+        changed or deleted, so every write path, demo seeding included, keeps
+        the total current. The backfill runs in the trigger's transaction,
+        which holds off concurrent entry writes until both are in place.
+        """
+        db.execute(
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS closed_seconds NUMERIC NOT NULL DEFAULT 0"
+        )
+        db.execute(
+            """
+            CREATE OR REPLACE FUNCTION time_entries_tally_closed_seconds()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.ended_at IS NOT NULL THEN
+                    UPDATE tasks
+                    SET closed_seconds = closed_seconds
+                        - (EXTRACT(EPOCH FROM OLD.ended_at) - EXTRACT(EPOCH FROM OLD.started_at))
+                    WHERE id = OLD.task_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.ended_at IS NOT NULL THEN
+                    UPDATE tasks
+                    SET closed_seconds = closed_seconds
+                        + (EXTRACT(EPOCH FROM NEW.ended_at) - EXTRACT(EPOCH FROM NEW.started_at))
+                    WHERE id = NEW.task_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """
+        )
+        db.execute("DROP TRIGGER IF EXISTS time_entries_tally_closed_seconds ON time_entries")
+        db.execute(
+            """
+            CREATE TRIGGER time_entries_tally_closed_seconds
+            AFTER INSERT OR DELETE OR UPDATE OF task_id, started_at, ended_at ON time_entries
+            FOR EACH ROW EXECUTE FUNCTION time_entries_tally_closed_seconds()
+            """
+        )
+        db.execute(
+            """
+            UPDATE tasks t
+            SET closed_seconds = totals.seconds
+            FROM (
+                SELECT task_id,
+                       SUM(EXTRACT(EPOCH FROM ended_at) - EXTRACT(EPOCH FROM started_at)) AS seconds
+                FROM time_entries
+                WHERE ended_at IS NOT NULL
+                GROUP BY task_id
+            ) AS totals
+            WHERE t.id = totals.task_id
+            """
+        )
+        db.commit()
+
+        # Serves the recent-entries half of the task list query.
+        self._execute_autocommit(
+            db,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS idx_time_entries_user_ended",
+                "CREATE INDEX CONCURRENTLY idx_time_entries_user_ended "
+                "ON time_entries(user_id, ended_at)",
+            ],
+        )
+
+    def _migrate_user_data_version(self, db):
+        """Count each user's writes so unchanged responses can be detected."""
+        db.execute(
+            'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0'
+        )
+        db.commit()
+
     def fetch_weekly_goals(self, week_start=None, week_end=None):
         user_id = self._require_user_id()
         db = self._get_db()
@@ -537,7 +1146,7 @@ class PostgresTaskRepository:
             ),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_weekly_goal(self, goal_id, title, target_seconds, status, long_term_goal_id=None, label_id=None):
@@ -561,7 +1170,7 @@ class PostgresTaskRepository:
                 user_id,
             ),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_weekly_goal(self, goal_id):
         user_id = self._require_user_id()
@@ -570,7 +1179,7 @@ class PostgresTaskRepository:
             "DELETE FROM weekly_goals WHERE id = %s AND user_id = %s",
             (int(goal_id), user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def ensure_user(self, email):
         """Ensure user exists in the database. Create if not exists.
@@ -578,7 +1187,7 @@ class PostgresTaskRepository:
         Uses SERIALIZABLE isolation level to prevent race conditions when
         multiple concurrent requests try to create the same user.
         """
-        user_id = self._current_user_id()
+        user_id = self.current_user_id()
         if user_id is None:
             return None
         db = self._get_db()
@@ -605,6 +1214,7 @@ class PostgresTaskRepository:
                     raise UserEmailConflictError(
                         f"user_id={user_id} is already mapped to a different email."
                     )
+                # Nothing changed, so the data version stays put.
                 db.commit()
                 return user_id
 
@@ -646,7 +1256,7 @@ class PostgresTaskRepository:
                 tuple(values),
             )
 
-            db.commit()
+            self._commit(db)
             return user_id
 
         except Exception as e:
@@ -655,37 +1265,71 @@ class PostgresTaskRepository:
 
     def ensure_default_project(self, name, created_at):
         db = self._get_db()
-        user_id = self._current_user_id()
+        user_id = self.current_user_id()
         if user_id is None:
             return None
-        db.execute(
+        inserted = db.execute(
             """
             INSERT INTO projects (user_id, name, created_at)
             VALUES (%s, %s, %s)
             ON CONFLICT (user_id, name) DO NOTHING
             """,
             (user_id, name, created_at),
-        )
+        ).rowcount
         row = db.execute(
             "SELECT id FROM projects WHERE user_id = %s AND name = %s",
             (user_id, name),
         ).fetchone()
-        db.commit()
+        if inserted:
+            self._commit(db)
+        else:
+            db.commit()
         return row["id"] if row else None
 
     def backfill_tasks_project(self, project_id):
         db = self._get_db()
-        user_id = self._current_user_id()
+        user_id = self.current_user_id()
         if user_id is None:
             return
-        db.execute(
+        updated = db.execute(
             "UPDATE tasks SET project_id = %s WHERE user_id = %s AND (project_id IS NULL OR project_id = 0)",
             (project_id, user_id),
-        )
-        db.commit()
+        ).rowcount
+        if updated:
+            self._commit(db)
+        else:
+            db.commit()
 
     def fetch_tasks(self, now_ts=None, rolling_start=None, day_start=None):
+        return self._fetch_tasks_with_time("", (), now_ts, rolling_start, day_start)
+
+    def fetch_tasks_by_project(self, project_id, now_ts=None, rolling_start=None, day_start=None):
+        return self._fetch_tasks_with_time(
+            "AND t.project_id = %s", (project_id,), now_ts, rolling_start, day_start
+        )
+
+    def fetch_tasks_by_ids(self, task_ids, now_ts=None, rolling_start=None, day_start=None):
+        if not task_ids:
+            return []
+        placeholders = ",".join(["%s"] * len(task_ids))
+        return self._fetch_tasks_with_time(
+            f"AND t.id IN ({placeholders})", tuple(task_ids), now_ts, rolling_start, day_start
+        )
+
+    def _fetch_tasks_with_time(self, filter_sql, filter_params, now_ts, rolling_start, day_start):
         db = self._get_db()
+        sql, params = self._tasks_with_time_query(
+            filter_sql, filter_params, now_ts, rolling_start, day_start
+        )
+        return db.execute(sql, params).fetchall()
+
+    def _tasks_with_time_query(self, filter_sql, filter_params, now_ts, rolling_start, day_start):
+        """The user's tasks with their time totals and running state.
+
+        total_seconds is the task's stored closed_seconds plus its running
+        entry, so only entries that are running or ended inside the rolling
+        or today window are joined.
+        """
         user_id = self._require_user_id()
         now_ts = int(now_ts or datetime.utcnow().timestamp())
         rolling_start = int(rolling_start or (now_ts - 24 * 60 * 60))
@@ -693,38 +1337,50 @@ class PostgresTaskRepository:
             day_start
             or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
         )
-        tasks = db.execute(
-            """
+        return (
+            f"""
             WITH params AS (
                 SELECT
                     %s::bigint AS now_ts,
                     %s::bigint AS rolling_start,
-                    %s::bigint AS day_start
+                    %s::bigint AS day_start,
+                    %s::bigint AS max_timer_seconds
+            ),
+            recent AS (
+                SELECT te.task_id, te.started_at, te.ended_at
+                FROM time_entries te
+                CROSS JOIN params
+                WHERE te.user_id = %s
+                  AND te.ended_at > to_timestamp(LEAST(params.rolling_start, params.day_start))
+                UNION ALL
+                SELECT te.task_id, te.started_at, te.ended_at
+                FROM time_entries te
+                WHERE te.user_id = %s AND te.ended_at IS NULL
             )
             SELECT t.id, t.name, t.project_id, t.status, t.completed_at, t.priority,
                    p.name AS project_name,
-                   COALESCE(SUM(
+                   t.closed_seconds + COALESCE(SUM(
                        CASE
-                           WHEN te.id IS NULL THEN 0
-                           WHEN te.ended_at IS NULL THEN (
-                               params.now_ts - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                           )
-                           ELSE (
-                               EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                               - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
+                           WHEN te.task_id IS NOT NULL AND te.ended_at IS NULL THEN LEAST(
+                               params.now_ts - EXTRACT(EPOCH FROM te.started_at),
+                               params.max_timer_seconds
                            )
+                           ELSE 0
                        END
                    ), 0) AS total_seconds,
                    COALESCE(SUM(
                        CASE
-                           WHEN te.id IS NULL THEN 0
+                           WHEN te.task_id IS NULL THEN 0
                            ELSE GREATEST(
                                0,
                                LEAST(
-                                   COALESCE(EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC')), params.now_ts),
+                                   COALESCE(
+                                       EXTRACT(EPOCH FROM te.ended_at),
+                                       EXTRACT(EPOCH FROM te.started_at) + params.max_timer_seconds
+                                   ),
                                    params.now_ts
                                ) - GREATEST(
-                                   EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC')),
+                                   EXTRACT(EPOCH FROM te.started_at),
                                    params.rolling_start
                                )
                            )
@@ -732,105 +1388,144 @@ class PostgresTaskRepository:
                    ), 0) AS rolling_24h_seconds,
                    COALESCE(SUM(
                        CASE
-                           WHEN te.id IS NULL THEN 0
+                           WHEN te.task_id IS NULL THEN 0
                            ELSE GREATEST(
                                0,
                                LEAST(
-                                   COALESCE(EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC')), params.now_ts),
+                                   COALESCE(
+                                       EXTRACT(EPOCH FROM te.ended_at),
+                                       EXTRACT(EPOCH FROM te.started_at) + params.max_timer_seconds
+                                   ),
                                    params.now_ts
                                ) - GREATEST(
-                                   EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC')),
+                                   EXTRACT(EPOCH FROM te.started_at),
                                    params.day_start
                                )
                            )
                        END
                    ), 0) AS today_seconds,
-                   MAX(CASE WHEN te.id IS NOT NULL AND te.ended_at IS NULL THEN 1 ELSE 0 END) AS is_running
+                   MAX(
+                       CASE
+                           WHEN te.task_id IS NOT NULL
+                                AND te.ended_at IS NULL
+                                AND EXTRACT(EPOCH FROM te.started_at) + params.max_timer_seconds > params.now_ts
+                           THEN 1
+                           ELSE 0
+                       END
+                   ) AS is_running
             FROM tasks t
             CROSS JOIN params
             LEFT JOIN projects p ON p.id = t.project_id
-            LEFT JOIN time_entries te ON te.task_id = t.id AND te.user_id = %s
-            WHERE t.user_id = %s
-            GROUP BY t.id, t.name, t.project_id, t.status, t.completed_at, t.priority, p.name
-            ORDER BY t.created_at DESC
+            LEFT JOIN recent te ON te.task_id = t.id
+            WHERE t.user_id = %s {filter_sql}
+            GROUP BY t.id, t.name, t.project_id, t.status, t.completed_at, t.priority,
+                     t.closed_seconds, p.name
+            ORDER BY t.created_at DESC, t.id DESC
             """,
-            (now_ts, rolling_start, day_start, user_id, user_id),
-        ).fetchall()
-        return tasks
+            (now_ts, rolling_start, day_start, MAX_TIMER_SECONDS, user_id, user_id, user_id, *filter_params),
+        )
 
-    def fetch_tasks_by_project(self, project_id, now_ts=None, rolling_start=None, day_start=None):
+    def fetch_tasks_payload_json(self, now_ts, rolling_start, day_start, log_date):
+        """The task list payload, assembled by Postgres and returned as JSON text.
+
+        Matches the Python path (fetch_tasks, fetch_task_hydration and the
+        route's task serializer): the same fields, split into tasks,
+        done_today_tasks and completed_tasks, newest first.
+        """
         db = self._get_db()
         user_id = self._require_user_id()
-        now_ts = int(now_ts or datetime.utcnow().timestamp())
-        rolling_start = int(rolling_start or (now_ts - 24 * 60 * 60))
-        day_start = int(
-            day_start
-            or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        tasks_sql, tasks_params = self._tasks_with_time_query(
+            "", (), now_ts, rolling_start, day_start
         )
-        tasks = db.execute(
-            """
-            WITH params AS (
+        return db.execute(
+            f"""
+            WITH task_rows AS (
+                {tasks_sql}
+            ),
+            hydrated AS (
                 SELECT
-                    %s::bigint AS now_ts,
-                    %s::bigint AS rolling_start,
-                    %s::bigint AS day_start
+                    tr.*,
+                    t.created_at,
+                    COALESCE(
+                        (
+                            SELECT json_agg(
+                                json_build_object('id', l.id, 'name', l.name, 'color', l.color)
+                                ORDER BY l.created_at DESC
+                            )
+                            FROM task_labels tl
+                            JOIN labels l ON l.id = tl.label_id
+                            WHERE tl.task_id = tr.id AND l.user_id = %s
+                        ),
+                        '[]'::json
+                    ) AS labels,
+                    EXISTS (
+                        SELECT 1 FROM task_daily_checks tdc
+                        WHERE tdc.task_id = tr.id AND tdc.log_date = %s
+                    ) AS checked_today,
+                    (
+                        SELECT COUNT(*) FROM task_daily_checks tdc
+                        WHERE tdc.task_id = tr.id
+                    ) AS daily_checks,
+                    COALESCE(
+                        (
+                            SELECT json_agg(json_build_object('id', g.id, 'name', g.name) ORDER BY g.id)
+                            FROM goal_tasks gt
+                            JOIN goals g ON g.id = gt.goal_id
+                            WHERE gt.task_id = tr.id AND g.user_id = %s
+                        ),
+                        '[]'::json
+                    ) AS goals
+                FROM task_rows tr
+                JOIN tasks t ON t.id = tr.id
+            ),
+            serialized AS (
+                SELECT
+                    id,
+                    created_at,
+                    CASE
+                        WHEN COALESCE(NULLIF(status, ''), 'active') = 'completed' THEN 'completed_tasks'
+                        WHEN checked_today THEN 'done_today_tasks'
+                        ELSE 'tasks'
+                    END AS bucket,
+                    json_build_object(
+                        'id', id,
+                        'name', name,
+                        'total_seconds', trunc(COALESCE(total_seconds, 0))::bigint,
+                        'rolling_24h_seconds', trunc(COALESCE(rolling_24h_seconds, 0))::bigint,
+                        'today_seconds', trunc(COALESCE(today_seconds, 0))::bigint,
+                        'is_running', is_running = 1,
+                        'project_id', project_id,
+                        'project_name', project_name,
+                        'labels', labels,
+                        'goal_id', (goals -> 0 ->> 'id')::integer,
+                        'goal_name', goals -> 0 ->> 'name',
+                        'goals', goals,
+                        'status', COALESCE(NULLIF(status, ''), 'active'),
+                        'checked_today', checked_today,
+                        'daily_checks', daily_checks,
+                        'completed_at', completed_at,
+                        'priority', COALESCE(NULLIF(priority, ''), 'medium')
+                    ) AS task
+                FROM hydrated
             )
-            SELECT t.id, t.name, t.project_id, t.status, t.completed_at, t.priority,
-                   p.name AS project_name,
-                   COALESCE(SUM(
-                       CASE
-                           WHEN te.id IS NULL THEN 0
-                           WHEN te.ended_at IS NULL THEN (
-                               params.now_ts - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                           )
-                           ELSE (
-                               EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                               - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                           )
-                       END
-                   ), 0) AS total_seconds,
-                   COALESCE(SUM(
-                       CASE
-                           WHEN te.id IS NULL THEN 0
-                           ELSE GREATEST(
-                               0,
-                               LEAST(
-                                   COALESCE(EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC')), params.now_ts),
-                                   params.now_ts
-                               ) - GREATEST(
-                                   EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC')),
-                                   params.rolling_start
-                               )
-                           )
-                       END
-                   ), 0) AS rolling_24h_seconds,
-                   COALESCE(SUM(
-                       CASE
-                           WHEN te.id IS NULL THEN 0
-                           ELSE GREATEST(
-                               0,
-                               LEAST(
-                                   COALESCE(EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC')), params.now_ts),
-                                   params.now_ts
-                               ) - GREATEST(
-                                   EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC')),
-                                   params.day_start
-                               )
-                           )
-                       END
-                   ), 0) AS today_seconds,
-                   MAX(CASE WHEN te.id IS NOT NULL AND te.ended_at IS NULL THEN 1 ELSE 0 END) AS is_running
-            FROM tasks t
-            CROSS JOIN params
-            LEFT JOIN projects p ON p.id = t.project_id
-            LEFT JOIN time_entries te ON te.task_id = t.id AND te.user_id = %s
-            WHERE t.user_id = %s AND t.project_id = %s
-            GROUP BY t.id, t.name, t.project_id, t.status, t.completed_at, t.priority, p.name
-            ORDER BY t.created_at DESC
+            SELECT json_build_object(
+                'tasks', COALESCE(
+                    json_agg(task ORDER BY created_at DESC, id DESC) FILTER (WHERE bucket = 'tasks'),
+                    '[]'::json
+                ),
+                'done_today_tasks', COALESCE(
+                    json_agg(task ORDER BY created_at DESC, id DESC) FILTER (WHERE bucket = 'done_today_tasks'),
+                    '[]'::json
+                ),
+                'completed_tasks', COALESCE(
+                    json_agg(task ORDER BY created_at DESC, id DESC) FILTER (WHERE bucket = 'completed_tasks'),
+                    '[]'::json
+                )
+            )::text AS payload
+            FROM serialized
             """,
-            (now_ts, rolling_start, day_start, user_id, user_id, project_id),
-        ).fetchall()
-        return tasks
+            (*tasks_params, user_id, log_date, user_id),
+        ).fetchone()["payload"]
 
     def fetch_project(self, project_id):
         db = self._get_db()
@@ -852,7 +1547,7 @@ class PostgresTaskRepository:
             (user_id, name, created_at, project_id, priority),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_task(self, task_id, name):
@@ -862,7 +1557,7 @@ class PostgresTaskRepository:
             "UPDATE tasks SET name = %s WHERE id = %s AND user_id = %s",
             (name, task_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def update_task_details(self, task_id, name=None, project_id=None, priority=None):
         db = self._get_db()
@@ -885,7 +1580,7 @@ class PostgresTaskRepository:
             f"UPDATE tasks SET {', '.join(updates)} WHERE id = %s AND user_id = %s",
             tuple(params),
         )
-        db.commit()
+        self._commit(db)
 
     def set_task_labels(self, task_id, label_ids):
         db = self._get_db()
@@ -914,22 +1609,43 @@ class PostgresTaskRepository:
                 (user_id, *cleaned_ids),
             ).fetchall()
             allowed_ids = {row["id"] for row in rows}
-        db.execute("DELETE FROM task_labels WHERE task_id = %s", (task_id,))
-        for label_id in sorted(allowed_ids):
-            db.execute(
-                "INSERT INTO task_labels (task_id, label_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (task_id, label_id),
-            )
-        db.commit()
+        self._sync_associations(db, "task_labels", "task_id", task_id, "label_id", allowed_ids)
 
     def set_task_status(self, task_id, status, completed_at):
+        self.set_tasks_status([task_id], status, completed_at)
+
+    def set_tasks_status(self, task_ids, status, completed_at):
         db = self._get_db()
         user_id = self._require_user_id()
         db.execute(
-            "UPDATE tasks SET status = %s, completed_at = %s WHERE id = %s AND user_id = %s",
-            (status, completed_at, task_id, user_id),
+            "UPDATE tasks SET status = %s, completed_at = %s WHERE id = ANY(%s) AND user_id = %s",
+            (status, completed_at, list(task_ids), user_id),
         )
-        db.commit()
+        self._commit(db)
+
+    def complete_tasks(self, task_ids, completed_at):
+        """Mark tasks completed and stop their timers at completed_at, in one statement."""
+        db = self._get_db()
+        user_id = self._require_user_id()
+        db.execute(
+            """
+            WITH completed AS (
+                UPDATE tasks
+                SET status = 'completed', completed_at = %s
+                WHERE id = ANY(%s) AND user_id = %s
+                RETURNING id
+            ),
+            closed AS (
+                UPDATE time_entries
+                SET ended_at = LEAST(%s::timestamptz, started_at + INTERVAL '1 second' * %s)
+                WHERE task_id IN (SELECT id FROM completed) AND ended_at IS NULL AND user_id = %s
+                RETURNING user_id, started_at, ended_at
+            )
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed"),
+            (completed_at, list(task_ids), user_id, completed_at, MAX_TIMER_SECONDS, user_id),
+        )
+        self._commit(db)
 
     def fetch_projects(self):
         db = self._get_db()
@@ -962,7 +1678,7 @@ class PostgresTaskRepository:
             (user_id, name, created_at),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_project(self, project_id, name):
@@ -972,18 +1688,23 @@ class PostgresTaskRepository:
             "UPDATE projects SET name = %s WHERE id = %s AND user_id = %s",
             (name, project_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_project(self, project_id):
         db = self._get_db()
         user_id = self._require_user_id()
+        self._lock_daily_rollups(db, user_id)
         db.execute(
             """
-            DELETE FROM time_entries
-            WHERE user_id = %s AND task_id IN (
-                SELECT id FROM tasks WHERE project_id = %s AND user_id = %s
+            WITH removed AS (
+                DELETE FROM time_entries
+                WHERE user_id = %s AND task_id IN (
+                    SELECT id FROM tasks WHERE project_id = %s AND user_id = %s
+                )
+                RETURNING user_id, started_at, ended_at
             )
-            """,
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="removed"),
             (user_id, project_id, user_id),
         )
         db.execute(
@@ -1001,7 +1722,7 @@ class PostgresTaskRepository:
         )
         db.execute("DELETE FROM tasks WHERE project_id = %s AND user_id = %s", (project_id, user_id))
         db.execute("DELETE FROM projects WHERE id = %s AND user_id = %s", (project_id, user_id))
-        db.commit()
+        self._commit(db)
 
     def fetch_labels(self):
         db = self._get_db()
@@ -1040,48 +1761,66 @@ class PostgresTaskRepository:
         rows = db.execute(
             f"""
             SELECT t.id AS task_id,
-                   COALESCE(SUM(
+                   t.closed_seconds + COALESCE(SUM(
                        CASE
                            WHEN te.id IS NULL THEN 0
-                           WHEN te.ended_at IS NULL THEN (
-                               EXTRACT(EPOCH FROM NOW()) - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                           )
-                           ELSE (
-                               EXTRACT(EPOCH FROM (CAST(te.ended_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
-                               - EXTRACT(EPOCH FROM (CAST(te.started_at AS TIMESTAMP) AT TIME ZONE 'UTC'))
+                           ELSE LEAST(
+                               EXTRACT(EPOCH FROM NOW()) - EXTRACT(EPOCH FROM te.started_at),
+                               %s
                            )
                        END
                    ), 0) AS total_seconds
             FROM tasks t
-            LEFT JOIN time_entries te ON te.task_id = t.id AND te.user_id = %s
+            LEFT JOIN time_entries te
+              ON te.task_id = t.id AND te.user_id = %s AND te.ended_at IS NULL
             WHERE t.user_id = %s AND t.id IN ({placeholders})
-            GROUP BY t.id
+            GROUP BY t.id, t.closed_seconds
             """,
-            (user_id, user_id, *task_ids),
+            (MAX_TIMER_SECONDS, user_id, user_id, *task_ids),
         ).fetchall()
         return {row["task_id"]: int(row["total_seconds"] or 0) for row in rows}
 
-    def get_setting(self, key):
+    def fetch_settings(self):
+        user_id = self.current_user_id()
+        cached = g.get("settings_snapshot")
+        if cached is not None and cached[0] == user_id:
+            return cached[1]
+
         db = self._get_db()
-        user_id = self._current_user_id()
-        scoped_key = f"user:{user_id}:{key}" if user_id is not None else key
-        row = db.execute(
-            "SELECT value FROM app_settings WHERE key = %s",
-            (scoped_key,),
-        ).fetchone()
-        if row:
-            return row["value"]
         if user_id is None:
-            return None
-        fallback = db.execute(
-            "SELECT value FROM app_settings WHERE key = %s",
-            (key,),
-        ).fetchone()
-        return fallback["value"] if fallback else None
+            rows = db.execute(
+                "SELECT key, value FROM app_settings WHERE key NOT LIKE 'user:%%'"
+            ).fetchall()
+        else:
+            rows = db.execute(
+                """
+                SELECT key, value
+                FROM app_settings
+                WHERE key LIKE %s OR key NOT LIKE 'user:%%'
+                """,
+                (f"user:{user_id}:%",),
+            ).fetchall()
+
+        # Scoped values win over global ones, matching the old per-key fallback.
+        prefix = f"user:{user_id}:"
+        settings = {}
+        scoped = {}
+        for row in rows:
+            key = row["key"]
+            if user_id is not None and key.startswith(prefix):
+                scoped[key[len(prefix):]] = row["value"]
+            else:
+                settings[key] = row["value"]
+        settings.update(scoped)
+        g.settings_snapshot = (user_id, settings)
+        return settings
+
+    def get_setting(self, key):
+        return self.fetch_settings().get(key)
 
     def set_setting(self, key, value):
         db = self._get_db()
-        user_id = self._current_user_id()
+        user_id = self.current_user_id()
         scoped_key = f"user:{user_id}:{key}" if user_id is not None else key
         db.execute(
             """
@@ -1091,10 +1830,16 @@ class PostgresTaskRepository:
             """,
             (scoped_key, value),
         )
-        db.commit()
+        self._commit(db)
+        cached = g.get("settings_snapshot")
+        if cached is not None and cached[0] == user_id:
+            cached[1][key] = value
 
     def execute_sql(self, sql):
         db = self._get_db()
+        user_id = self.current_user_id()
+        if user_id is not None:
+            self._lock_daily_rollups(db, user_id)
         cleaned_lines = []
         for line in sql.splitlines():
             stripped = line.strip()
@@ -1106,7 +1851,44 @@ class PostgresTaskRepository:
             stmt = statement.strip()
             if stmt:
                 db.execute(stmt)
-        db.commit()
+        if user_id is not None:
+            # The script may have written any of the user's time entries.
+            db.execute("DELETE FROM time_daily_rollups WHERE user_id = %s", (user_id,))
+        self._commit(db)
+        g.pop("settings_snapshot", None)
+
+    def fetch_data_version(self):
+        """The user's data_version, whether one of their timers is running, and
+        the state of their rolling 24h window.
+
+        rolling_window_start is the earliest start (epoch seconds) of the
+        entries that ended in the last 24 hours; rolling totals next change
+        when it leaves the window. rolling_window_straddled says an entry is
+        already partly outside the window, so those totals change every second.
+        """
+        db = self._get_db()
+        user_id = self._require_user_id()
+        return db.execute(
+            """
+            WITH rolling AS (
+                SELECT MIN(te.started_at) AS first_started
+                FROM time_entries te
+                WHERE te.user_id = %s AND te.ended_at > NOW() - INTERVAL '24 hours'
+            )
+            SELECT u.data_version,
+                   EXISTS (
+                       SELECT 1 FROM time_entries te
+                       WHERE te.user_id = u.id AND te.ended_at IS NULL
+                   ) AS timer_running,
+                   EXTRACT(EPOCH FROM rolling.first_started)::bigint AS rolling_window_start,
+                   COALESCE(rolling.first_started < NOW() - INTERVAL '24 hours', FALSE)
+                       AS rolling_window_straddled
+            FROM "user" u
+            CROSS JOIN rolling
+            WHERE u.id = %s
+            """,
+            (user_id, user_id),
+        ).fetchone()
 
     def user_has_any_data(self):
         user_id = self._require_user_id()
@@ -1134,6 +1916,7 @@ class PostgresTaskRepository:
     def clear_user_data(self):
         user_id = self._require_user_id()
         db = self._get_db()
+        self._lock_daily_rollups(db, user_id)
         # Clear join tables first to avoid FK constraint errors.
         db.execute(
             "DELETE FROM task_labels WHERE task_id IN (SELECT id FROM tasks WHERE user_id = %s)",
@@ -1175,6 +1958,7 @@ class PostgresTaskRepository:
             "DELETE FROM time_entries WHERE user_id = %s",
             (user_id,),
         )
+        db.execute("DELETE FROM time_daily_rollups WHERE user_id = %s", (user_id,))
         db.execute(
             "DELETE FROM task_daily_checks WHERE task_id IN (SELECT id FROM tasks WHERE user_id = %s)",
             (user_id,),
@@ -1192,7 +1976,7 @@ class PostgresTaskRepository:
         db.execute("DELETE FROM tasks WHERE user_id = %s", (user_id,))
         db.execute("DELETE FROM projects WHERE user_id = %s", (user_id,))
         db.execute("DELETE FROM labels WHERE user_id = %s", (user_id,))
-        db.commit()
+        self._commit(db)
 
     def create_label(self, name, color, created_at):
         db = self._get_db()
@@ -1201,7 +1985,7 @@ class PostgresTaskRepository:
             "INSERT INTO labels (user_id, name, color, created_at) VALUES (%s, %s, %s, %s)",
             (user_id, name, color, created_at),
         )
-        db.commit()
+        self._commit(db)
 
     def update_label(self, label_id, name, color):
         db = self._get_db()
@@ -1210,7 +1994,7 @@ class PostgresTaskRepository:
             "UPDATE labels SET name = %s, color = %s WHERE id = %s AND user_id = %s",
             (name, color, label_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_label(self, label_id):
         db = self._get_db()
@@ -1226,7 +2010,7 @@ class PostgresTaskRepository:
         db.execute("DELETE FROM task_labels WHERE label_id = %s", (label_id,))
         db.execute("DELETE FROM project_labels WHERE label_id = %s", (label_id,))
         db.execute("DELETE FROM labels WHERE id = %s AND user_id = %s", (label_id, user_id))
-        db.commit()
+        self._commit(db)
 
     def add_label_to_task(self, task_id, label_id):
         db = self._get_db()
@@ -1234,7 +2018,7 @@ class PostgresTaskRepository:
             "INSERT INTO task_labels (task_id, label_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
             (task_id, label_id),
         )
-        db.commit()
+        self._commit(db)
 
     def add_label_to_project(self, project_id, label_id):
         db = self._get_db()
@@ -1242,7 +2026,7 @@ class PostgresTaskRepository:
             "INSERT INTO project_labels (project_id, label_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
             (project_id, label_id),
         )
-        db.commit()
+        self._commit(db)
 
     def set_project_labels(self, project_id, label_ids):
         db = self._get_db()
@@ -1271,13 +2055,9 @@ class PostgresTaskRepository:
                 (user_id, *cleaned_ids),
             ).fetchall()
             allowed_ids = {row["id"] for row in rows}
-        db.execute("DELETE FROM project_labels WHERE project_id = %s", (project_id,))
-        for label_id in sorted(allowed_ids):
-            db.execute(
-                "INSERT INTO project_labels (project_id, label_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (project_id, label_id),
-            )
-        db.commit()
+        self._sync_associations(
+            db, "project_labels", "project_id", project_id, "label_id", allowed_ids
+        )
 
     def set_project_goals(self, project_id, goal_ids):
         db = self._get_db()
@@ -1306,13 +2086,9 @@ class PostgresTaskRepository:
                 (user_id, *cleaned_ids),
             ).fetchall()
             allowed_ids = {row["id"] for row in rows}
-        db.execute("DELETE FROM goal_projects WHERE project_id = %s", (project_id,))
-        for goal_id in sorted(allowed_ids):
-            db.execute(
-                "INSERT INTO goal_projects (goal_id, project_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (goal_id, project_id),
-            )
-        db.commit()
+        self._sync_associations(
+            db, "goal_projects", "project_id", project_id, "goal_id", allowed_ids
+        )
 
     def fetch_goals(self):
         db = self._get_db()
@@ -1396,7 +2172,7 @@ class PostgresTaskRepository:
             ),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_goal(self, goal_id, name, description, status, priority, target_date, target_seconds, label_id):
@@ -1421,7 +2197,7 @@ class PostgresTaskRepository:
                 user_id,
             ),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_goal(self, goal_id):
         db = self._get_db()
@@ -1452,7 +2228,7 @@ class PostgresTaskRepository:
             (goal_id, user_id),
         )
         db.execute("DELETE FROM goals WHERE id = %s AND user_id = %s", (goal_id, user_id))
-        db.commit()
+        self._commit(db)
 
     def fetch_goal_projects(self, goal_ids):
         if not goal_ids:
@@ -1498,24 +2274,80 @@ class PostgresTaskRepository:
         """Return {task_id: [ {id, name}, ... ]} for the provided task ids."""
         if not task_ids:
             return {}
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._task_goals_query(task_ids)])
+        return _group_rows(rows, "task_id", ("id", "name"))
+
+    def _task_goals_query(self, task_ids):
         user_id = self._require_user_id()
         placeholders = ",".join(["%s"] * len(task_ids))
-        rows = db.execute(
+        return (
             f"""
-            SELECT gt.task_id, g.id AS goal_id, g.name
+            SELECT gt.task_id, g.id, g.name
             FROM goal_tasks gt
             JOIN goals g ON g.id = gt.goal_id
             WHERE g.user_id = %s AND gt.task_id IN ({placeholders})
+            ORDER BY g.id
             """,
             (user_id, *task_ids),
-        ).fetchall()
-        mapping = {}
-        for row in rows:
-            mapping.setdefault(row["task_id"], []).append(
-                {"id": row["goal_id"], "name": row["name"]}
+        )
+
+    def fetch_task_hydration(self, task_ids, log_date):
+        """Return (labels_map, checked_today, check_counts, goals_map) for tasks.
+
+        Same results as the four separate fetches, sent as one pipeline.
+        """
+        if not task_ids:
+            return {}, set(), {}, {}
+        label_rows, checked_rows, count_rows, goal_rows = self._fetch_pipelined(
+            [
+                self._task_labels_query(task_ids),
+                self._task_daily_checks_query(task_ids, log_date),
+                self._task_daily_check_counts_query(task_ids),
+                self._task_goals_query(task_ids),
+            ]
+        )
+        return (
+            _group_rows(label_rows, "task_id", ("id", "name", "color")),
+            {row["task_id"] for row in checked_rows},
+            {row["task_id"]: row["total"] for row in count_rows},
+            _group_rows(goal_rows, "task_id", ("id", "name")),
+        )
+
+    def _sync_associations(self, db, table, owner_column, owner_id, member_column, member_ids):
+        """Make owner_id's rows in a join table link exactly member_ids.
+
+        Only the links that change are written: one DELETE for the removed
+        members and one INSERT for the added ones. Commits, bumping the data
+        version only when something changed.
+        """
+        current_ids = {
+            row[member_column]
+            for row in db.execute(
+                f"SELECT {member_column} FROM {table} WHERE {owner_column} = %s",
+                (owner_id,),
+            ).fetchall()
+        }
+        wanted_ids = set(member_ids)
+        removed_ids = sorted(current_ids - wanted_ids)
+        added_ids = sorted(wanted_ids - current_ids)
+        if removed_ids:
+            db.execute(
+                f"DELETE FROM {table} WHERE {owner_column} = %s AND {member_column} = ANY(%s)",
+                (owner_id, removed_ids),
             )
-        return mapping
+        if added_ids:
+            db.execute(
+                f"""
+                INSERT INTO {table} ({owner_column}, {member_column})
+                SELECT %s, unnest(%s::integer[])
+                ON CONFLICT DO NOTHING
+                """,
+                (owner_id, added_ids),
+            )
+        if removed_ids or added_ids:
+            self._commit(db)
+        else:
+            db.commit()
 
     def set_task_goal(self, task_id, goal_id):
         """Assign a single goal to a task (replaces existing links)."""
@@ -1541,7 +2373,7 @@ class PostgresTaskRepository:
                 """,
                 (goal_id, task_id, goal_id, user_id, task_id, user_id),
             )
-        db.commit()
+        self._commit(db)
 
     def fetch_goal_subgoals(self, goal_ids):
         if not goal_ids:
@@ -1556,7 +2388,7 @@ class PostgresTaskRepository:
             FROM goal_subgoals gs
             JOIN goals g ON g.id = gs.goal_id
             WHERE g.user_id = %s AND gs.goal_id IN ({placeholders})
-            ORDER BY gs.created_at ASC
+            ORDER BY gs.created_at ASC, gs.id ASC
             """,
             (user_id, *goal_ids),
         ).fetchall()
@@ -1584,13 +2416,7 @@ class PostgresTaskRepository:
         ).fetchone()
         if not owns_goal:
             return
-        db.execute("DELETE FROM goal_projects WHERE goal_id = %s", (goal_id,))
-        for project_id in project_ids:
-            db.execute(
-                "INSERT INTO goal_projects (goal_id, project_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (goal_id, project_id),
-            )
-        db.commit()
+        self._sync_associations(db, "goal_projects", "goal_id", goal_id, "project_id", project_ids)
 
     def set_goal_tasks(self, goal_id, task_ids):
         db = self._get_db()
@@ -1601,13 +2427,7 @@ class PostgresTaskRepository:
         ).fetchone()
         if not owns_goal:
             return
-        db.execute("DELETE FROM goal_tasks WHERE goal_id = %s", (goal_id,))
-        for task_id in task_ids:
-            db.execute(
-                "INSERT INTO goal_tasks (goal_id, task_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (goal_id, task_id),
-            )
-        db.commit()
+        self._sync_associations(db, "goal_tasks", "goal_id", goal_id, "task_id", task_ids)
 
     def set_goal_subgoals(self, goal_id, subgoal_titles, created_at):
         db = self._get_db()
@@ -1618,16 +2438,73 @@ class PostgresTaskRepository:
         ).fetchone()
         if not owns_goal:
             return
-        db.execute("DELETE FROM goal_subgoals WHERE goal_id = %s", (goal_id,))
-        for title in subgoal_titles:
+        # Subgoals that keep their title keep their row, and with it their
+        # status; only dropped titles are deleted and new ones inserted.
+        existing = db.execute(
+            "SELECT id, title FROM goal_subgoals WHERE goal_id = %s ORDER BY created_at, id",
+            (goal_id,),
+        ).fetchall()
+        available = {}
+        for row in existing:
+            available.setdefault(row["title"], []).append(row["id"])
+        # The kept row id for each submitted title, or None for a new one.
+        ordered_ids = [
+            available[title].pop(0) if available.get(title) else None
+            for title in subgoal_titles
+        ]
+        removed_ids = [row_id for row_ids in available.values() for row_id in row_ids]
+        kept_ids = [row_id for row_id in ordered_ids if row_id is not None]
+        kept = set(kept_ids)
+        first_new = ordered_ids.index(None) if None in ordered_ids else len(ordered_ids)
+        # Subgoals are listed in created_at order. When kept rows were moved or
+        # new titles placed between them, stamp every subgoal in the submitted
+        # order; otherwise only the new ones, which go last, need stamps.
+        reordered = kept_ids != [row["id"] for row in existing if row["id"] in kept] or any(
+            row_id is not None for row_id in ordered_ids[first_new:]
+        )
+        base = datetime.fromisoformat(created_at)
+        stamps = [
+            (base + timedelta(microseconds=position)).isoformat()
+            for position in range(len(ordered_ids))
+        ]
+        added = [
+            (title, stamp)
+            for title, row_id, stamp in zip(subgoal_titles, ordered_ids, stamps)
+            if row_id is None
+        ]
+        if removed_ids:
+            db.execute(
+                "DELETE FROM goal_subgoals WHERE goal_id = %s AND id = ANY(%s)",
+                (goal_id, removed_ids),
+            )
+        if reordered and kept_ids:
+            kept_stamps = [
+                stamp for row_id, stamp in zip(ordered_ids, stamps) if row_id is not None
+            ]
             db.execute(
                 """
-                INSERT INTO goal_subgoals (goal_id, title, label, target_date, project_id, status, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                UPDATE goal_subgoals gs
+                SET created_at = moved.created_at
+                FROM unnest(%s::int[], %s::text[]) AS moved(id, created_at)
+                WHERE gs.id = moved.id AND gs.goal_id = %s
                 """,
-                (goal_id, title, None, None, None, "pending", created_at),
+                (kept_ids, kept_stamps, goal_id),
             )
-        db.commit()
+        if added:
+            db.execute(
+                """
+                INSERT INTO goal_subgoals (goal_id, title, status, created_at)
+                SELECT %s, title, 'pending', created_at
+                FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY
+                    AS added(title, created_at, position)
+                ORDER BY position
+                """,
+                (goal_id, [title for title, _ in added], [stamp for _, stamp in added]),
+            )
+        if removed_ids or reordered or added:
+            self._commit(db)
+        else:
+            db.commit()
 
     def fetch_goal_subgoal(self, subgoal_id):
         db = self._get_db()
@@ -1655,7 +2532,7 @@ class PostgresTaskRepository:
             """,
             (status, subgoal_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def add_goal_subgoal(self, goal_id, title, label, target_date, project_id, created_at):
         db = self._get_db()
@@ -1673,7 +2550,7 @@ class PostgresTaskRepository:
             """,
             (goal_id, title, label, target_date, project_id, "pending", created_at),
         )
-        db.commit()
+        self._commit(db)
 
     def fetch_habits(self):
         db = self._get_db()
@@ -1722,7 +2599,7 @@ class PostgresTaskRepository:
             ),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_habit(
@@ -1756,7 +2633,7 @@ class PostgresTaskRepository:
                 user_id,
             ),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_habit(self, habit_id):
         db = self._get_db()
@@ -1766,7 +2643,7 @@ class PostgresTaskRepository:
             (habit_id, user_id),
         )
         db.execute("DELETE FROM habits WHERE id = %s AND user_id = %s", (habit_id, user_id))
-        db.commit()
+        self._commit(db)
 
     def fetch_habit_logs_for_date(self, habit_ids, log_date):
         if not habit_ids:
@@ -1878,7 +2755,7 @@ class PostgresTaskRepository:
             ),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def update_reminder(
@@ -1922,7 +2799,7 @@ class PostgresTaskRepository:
                 user_id,
             ),
         )
-        db.commit()
+        self._commit(db)
 
     def set_reminder_active(self, reminder_id, is_active):
         db = self._get_db()
@@ -1931,7 +2808,7 @@ class PostgresTaskRepository:
             "UPDATE reminders SET is_active = %s WHERE id = %s AND user_id = %s",
             (1 if is_active else 0, reminder_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_reminder(self, reminder_id):
         db = self._get_db()
@@ -1940,7 +2817,7 @@ class PostgresTaskRepository:
             "DELETE FROM reminders WHERE id = %s AND user_id = %s",
             (reminder_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def fetch_todos_for_date(self, log_date):
         db = self._get_db()
@@ -1967,7 +2844,7 @@ class PostgresTaskRepository:
             (user_id, name, log_date, created_at),
         )
         row = cursor.fetchone()
-        db.commit()
+        self._commit(db)
         return row["id"] if row else None
 
     def set_todo_completed(self, todo_id, completed_at):
@@ -1977,7 +2854,7 @@ class PostgresTaskRepository:
             "UPDATE daily_todos SET completed_at = %s WHERE id = %s AND user_id = %s",
             (completed_at, todo_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def delete_todo(self, todo_id):
         db = self._get_db()
@@ -1986,7 +2863,7 @@ class PostgresTaskRepository:
             "DELETE FROM daily_todos WHERE id = %s AND user_id = %s",
             (todo_id, user_id),
         )
-        db.commit()
+        self._commit(db)
 
     def set_habit_log(self, habit_id, log_date, done):
         db = self._get_db()
@@ -2004,7 +2881,7 @@ class PostgresTaskRepository:
                 "DELETE FROM habit_logs WHERE habit_id = %s AND log_date = %s",
                 (habit_id, log_date),
             )
-        db.commit()
+        self._commit(db)
 
     def fetch_habit_log_counts(self, start_date, end_date):
         db = self._get_db()
@@ -2150,10 +3027,13 @@ class PostgresTaskRepository:
     def fetch_task_labels_map(self, task_ids):
         if not task_ids:
             return {}
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._task_labels_query(task_ids)])
+        return _group_rows(rows, "task_id", ("id", "name", "color"))
+
+    def _task_labels_query(self, task_ids):
         user_id = self._require_user_id()
         placeholders = ",".join(["%s"] * len(task_ids))
-        rows = db.execute(
+        return (
             f"""
             SELECT tl.task_id, l.id, l.name, l.color
             FROM task_labels tl
@@ -2163,35 +3043,34 @@ class PostgresTaskRepository:
             ORDER BY l.created_at DESC
             """,
             (user_id, user_id, *task_ids),
-        ).fetchall()
-        labels_map = {}
-        for row in rows:
-            labels_map.setdefault(row["task_id"], []).append(
-                {"id": row["id"], "name": row["name"], "color": row["color"]}
-            )
-        return labels_map
+        )
 
     def fetch_task_daily_checks_for_date(self, task_ids, log_date):
         if not task_ids:
             return set()
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._task_daily_checks_query(task_ids, log_date)])
+        return {row["task_id"] for row in rows}
+
+    def _task_daily_checks_query(self, task_ids, log_date):
         placeholders = ",".join(["%s"] * len(task_ids))
-        rows = db.execute(
+        return (
             f"""
             SELECT task_id
             FROM task_daily_checks
             WHERE task_id IN ({placeholders}) AND log_date = %s
             """,
             tuple(task_ids) + (log_date,),
-        ).fetchall()
-        return {row["task_id"] for row in rows}
+        )
 
     def fetch_task_daily_check_counts(self, task_ids):
         if not task_ids:
             return {}
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._task_daily_check_counts_query(task_ids)])
+        return {row["task_id"]: row["total"] for row in rows}
+
+    def _task_daily_check_counts_query(self, task_ids):
         placeholders = ",".join(["%s"] * len(task_ids))
-        rows = db.execute(
+        return (
             f"""
             SELECT task_id, COUNT(*) AS total
             FROM task_daily_checks
@@ -2199,8 +3078,7 @@ class PostgresTaskRepository:
             GROUP BY task_id
             """,
             tuple(task_ids),
-        ).fetchall()
-        return {row["task_id"]: row["total"] for row in rows}
+        )
 
     def fetch_task_daily_checks_between(self, task_ids, start_date, end_date):
         if not task_ids:
@@ -2222,30 +3100,44 @@ class PostgresTaskRepository:
         return checks
 
     def set_task_daily_check(self, task_id, log_date, done):
+        self.set_tasks_daily_check([task_id], log_date, done)
+
+    def set_tasks_daily_check(self, task_ids, log_date, done):
         db = self._get_db()
+        user_id = self._require_user_id()
         if done:
             db.execute(
                 """
                 INSERT INTO task_daily_checks (task_id, log_date, created_at)
-                VALUES (%s, %s, %s)
+                SELECT t.id, %s, %s
+                FROM tasks t
+                WHERE t.id = ANY(%s) AND t.user_id = %s
                 ON CONFLICT DO NOTHING
                 """,
-                (task_id, log_date, datetime.utcnow().isoformat()),
+                (log_date, datetime.utcnow().isoformat(), list(task_ids), user_id),
             )
         else:
             db.execute(
-                "DELETE FROM task_daily_checks WHERE task_id = %s AND log_date = %s",
-                (task_id, log_date),
+                """
+                DELETE FROM task_daily_checks tdc
+                USING tasks t
+                WHERE t.id = tdc.task_id AND t.user_id = %s
+                  AND tdc.task_id = ANY(%s) AND tdc.log_date = %s
+                """,
+                (user_id, list(task_ids), log_date),
             )
-        db.commit()
+        self._commit(db)
 
     def fetch_project_labels_map(self, project_ids):
         if not project_ids:
             return {}
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._project_labels_query(project_ids)])
+        return _group_rows(rows, "project_id", ("id", "name", "color"))
+
+    def _project_labels_query(self, project_ids):
         user_id = self._require_user_id()
         placeholders = ",".join(["%s"] * len(project_ids))
-        rows = db.execute(
+        return (
             f"""
             SELECT pl.project_id, l.id, l.name, l.color
             FROM project_labels pl
@@ -2255,21 +3147,18 @@ class PostgresTaskRepository:
             ORDER BY l.created_at DESC
             """,
             (user_id, user_id, *project_ids),
-        ).fetchall()
-        labels_map = {}
-        for row in rows:
-            labels_map.setdefault(row["project_id"], []).append(
-                {"id": row["id"], "name": row["name"], "color": row["color"]}
-            )
-        return labels_map
+        )
 
     def fetch_project_goals_map(self, project_ids):
         if not project_ids:
             return {}
-        db = self._get_db()
+        (rows,) = self._fetch_pipelined([self._project_goals_query(project_ids)])
+        return _group_rows(rows, "project_id", ("id", "name", "description"))
+
+    def _project_goals_query(self, project_ids):
         user_id = self._require_user_id()
         placeholders = ",".join(["%s"] * len(project_ids))
-        rows = db.execute(
+        return (
             f"""
             SELECT gp.project_id, g.id, g.name, g.description
             FROM goal_projects gp
@@ -2279,171 +3168,319 @@ class PostgresTaskRepository:
             ORDER BY g.created_at DESC
             """,
             (user_id, user_id, *project_ids),
-        ).fetchall()
-        goals_map = {}
-        for row in rows:
-            goals_map.setdefault(row["project_id"], []).append(
-                {"id": row["id"], "name": row["name"], "description": row["description"]}
-            )
-        return goals_map
+        )
 
-    def is_task_running(self, task_id):
-        db = self._get_db()
-        user_id = self._require_user_id()
-        row = db.execute(
-            """
-            SELECT 1
-            FROM time_entries
-            WHERE task_id = %s AND ended_at IS NULL AND user_id = %s
-            """,
-            (task_id, user_id),
-        ).fetchone()
-        return row is not None
+    def fetch_project_hydration(self, project_ids):
+        """Return (labels_map, goals_map) for projects, sent as one pipeline."""
+        if not project_ids:
+            return {}, {}
+        label_rows, goal_rows = self._fetch_pipelined(
+            [
+                self._project_labels_query(project_ids),
+                self._project_goals_query(project_ids),
+            ]
+        )
+        return (
+            _group_rows(label_rows, "project_id", ("id", "name", "color")),
+            _group_rows(goal_rows, "project_id", ("id", "name", "description")),
+        )
 
-    def fetch_tasks_running_status(self, task_ids):
-        """Bulk fetch running status for multiple tasks.
+    def fetch_running_timers(self, max_duration_seconds=MAX_TIMER_SECONDS):
+        """Return the user's running time entries with their task details.
 
-        Returns a dict mapping task_id -> boolean indicating if task is running.
+        Each row carries the entry id, task_id and started_at, the task name,
+        status and project, and an is_overdue flag for entries running longer
+        than max_duration_seconds. Served by idx_time_entries_user_running.
         """
-        if not task_ids:
-            return {}
         db = self._get_db()
         user_id = self._require_user_id()
-        placeholders = ",".join(["%s"] * len(task_ids))
-        rows = db.execute(
-            f"""
-            SELECT DISTINCT task_id
-            FROM time_entries
-            WHERE task_id IN ({placeholders}) AND ended_at IS NULL AND user_id = %s
+        return db.execute(
+            """
+            SELECT te.id, te.task_id, te.started_at,
+                   t.name AS task_name, t.status AS task_status,
+                   t.project_id, p.name AS project_name,
+                   te.started_at < NOW() - INTERVAL '1 second' * %s AS is_overdue
+            FROM time_entries te
+            JOIN tasks t ON t.id = te.task_id
+            LEFT JOIN projects p ON p.id = t.project_id
+            WHERE te.user_id = %s AND te.ended_at IS NULL
+            ORDER BY te.started_at
             """,
-            (*task_ids, user_id),
+            (max_duration_seconds, user_id),
         ).fetchall()
-        running_task_ids = {row["task_id"] for row in rows}
-        return {task_id: task_id in running_task_ids for task_id in task_ids}
 
     def start_task(self, task_id, started_at):
-        db = self._get_db()
-        user_id = self._require_user_id()
-        owns_task = db.execute(
-            "SELECT 1 FROM tasks WHERE id = %s AND user_id = %s",
-            (task_id, user_id),
-        ).fetchone()
-        if not owns_task:
-            return
+        """Start a timer for an owned task.
 
-        # Get next available ID based on actual data (safest approach)
-        max_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM time_entries").fetchone()["coalesce"]
-        next_id = max_id + 1
+        Returns the new entry id, or None when the task is not owned or
+        already has a running entry.
+        """
+        started = self.start_tasks([task_id], started_at)
+        return started[0] if started else None
 
-        db.execute(
-            "INSERT INTO time_entries (id, user_id, task_id, started_at) VALUES (%s, %s, %s, %s)",
-            (next_id, user_id, task_id, started_at),
-        )
-        db.commit()
+    def start_tasks(self, task_ids, started_at):
+        """Start a timer for each owned task in task_ids, in one transaction.
 
-    def stop_task(self, task_id, ended_at):
+        Returns the ids of the new entries; tasks that are not owned or
+        already have a running entry are skipped.
+        """
         db = self._get_db()
         user_id = self._require_user_id()
+        # An overdue timer the sweeper has not closed yet would otherwise hold
+        # the task's running slot.
         db.execute(
             """
-            UPDATE time_entries
-            SET ended_at = %s
-            WHERE task_id = %s AND ended_at IS NULL AND user_id = %s
-            """,
-            (ended_at, task_id, user_id),
+            WITH closed AS (
+                UPDATE time_entries
+                SET ended_at = started_at + INTERVAL '1 second' * %s
+                WHERE task_id = ANY(%s) AND user_id = %s
+                  AND ended_at IS NULL
+                  AND started_at < NOW() - INTERVAL '1 second' * %s
+                RETURNING user_id, started_at, ended_at
+            )
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed"),
+            (MAX_TIMER_SECONDS, list(task_ids), user_id, MAX_TIMER_SECONDS),
         )
-        db.commit()
+        rows = db.execute(
+            """
+            INSERT INTO time_entries (user_id, task_id, started_at)
+            SELECT t.user_id, t.id, %s
+            FROM tasks t
+            WHERE t.id = ANY(%s) AND t.user_id = %s
+            ON CONFLICT (task_id) WHERE ended_at IS NULL DO NOTHING
+            RETURNING id
+            """,
+            (started_at, list(task_ids), user_id),
+        ).fetchall()
+        self._commit(db)
+        return [row["id"] for row in rows]
+
+    def stop_task(self, task_id, ended_at):
+        self.stop_tasks([task_id], ended_at)
 
-    def fetch_running_time_entries(self):
+    def stop_tasks(self, task_ids, ended_at):
         db = self._get_db()
         user_id = self._require_user_id()
-        return db.execute(
+        db.execute(
             """
-            SELECT id, task_id, started_at
-            FROM time_entries
-            WHERE ended_at IS NULL AND user_id = %s
-            """,
-            (user_id,),
-        ).fetchall()
+            WITH closed AS (
+                UPDATE time_entries
+                SET ended_at = LEAST(%s::timestamptz, started_at + INTERVAL '1 second' * %s)
+                WHERE task_id = ANY(%s) AND ended_at IS NULL AND user_id = %s
+                RETURNING user_id, started_at, ended_at
+            )
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed"),
+            (ended_at, MAX_TIMER_SECONDS, list(task_ids), user_id),
+        )
+        self._commit(db)
 
     def stop_time_entry(self, entry_id, ended_at):
         db = self._get_db()
         user_id = self._require_user_id()
+        self._lock_daily_rollups(db, user_id)
+        # An entry that was already closed may be shortened; the days of its
+        # previous end need invalidating too.
         db.execute(
             """
-            UPDATE time_entries
-            SET ended_at = %s
-            WHERE id = %s AND user_id = %s
-            """,
-            (ended_at, entry_id, user_id),
+            WITH previous AS (
+                SELECT id, ended_at
+                FROM time_entries
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE
+            ),
+            closed AS (
+                UPDATE time_entries te
+                SET ended_at = %s
+                FROM previous
+                WHERE te.id = previous.id
+                RETURNING te.user_id, te.started_at,
+                          GREATEST(te.ended_at, previous.ended_at) AS ended_at
+            )
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed"),
+            (entry_id, user_id, ended_at),
         )
-        db.commit()
+        self._commit(db)
 
-    def complete_overdue_time_entries(self, max_duration_seconds=1500):
+    def rollover_running_time_entries(self, day_start):
         """
-        Automatically complete time entries that have been running for longer than max_duration_seconds.
-        Default is 1500 seconds (25 minutes for Pomodoro).
-        Returns the number of entries completed.
+        Close the user's running entries that started before day_start or ran
+        past the Pomodoro cap, ending each at whichever of the two comes
+        first. Runs once per request; returns the number of entries closed.
         """
-        db = self._get_db()
         user_id = self._require_user_id()
-        now_ts = datetime.utcnow().timestamp()
-        # Calculate the timestamp before which entries should be completed
-        cutoff_ts = now_ts - max_duration_seconds
-
-        # Find and complete overdue entries
-        # We set ended_at to started_at + max_duration_seconds to cap the time at the Pomodoro length
-        result = db.execute(
+        if g.get("rollover_user_id") == user_id:
+            return 0
+        db = self._get_db()
+        count = db.execute(
             """
-            UPDATE time_entries
-            SET ended_at = (
-                CAST(started_at AS TIMESTAMP) + INTERVAL '1 second' * %s
-            )
-            WHERE id IN (
-                SELECT id FROM time_entries
+            WITH closed AS (
+                UPDATE time_entries
+                SET ended_at = LEAST(
+                    CASE WHEN started_at < %s::timestamptz THEN %s::timestamptz END,
+                    CASE
+                        WHEN started_at + INTERVAL '1 second' * %s <= NOW()
+                        THEN started_at + INTERVAL '1 second' * %s
+                    END
+                )
                 WHERE user_id = %s
                   AND ended_at IS NULL
-                  AND EXTRACT(EPOCH FROM (CAST(started_at AS TIMESTAMP))) < %s
+                  AND (
+                      started_at < %s::timestamptz
+                      OR started_at + INTERVAL '1 second' * %s <= NOW()
+                  )
+                RETURNING user_id, started_at, ended_at
+            ),
+            invalidated AS (
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed")
+            + """
             )
-            RETURNING id, task_id, started_at, ended_at
+            SELECT COUNT(*) AS closed FROM closed
             """,
-            (max_duration_seconds, user_id, cutoff_ts),
-        )
-        completed = result.fetchall()
-        db.commit()
-        return len(completed)
+            (
+                day_start,
+                day_start,
+                MAX_TIMER_SECONDS,
+                MAX_TIMER_SECONDS,
+                user_id,
+                day_start,
+                MAX_TIMER_SECONDS,
+            ),
+        ).fetchone()["closed"]
+        if count:
+            self._commit(db)
+        else:
+            db.commit()
+        g.rollover_user_id = user_id
+        return count
+
+    def sweep_overdue_time_entries(self, max_duration_seconds=MAX_TIMER_SECONDS, batch_size=500):
+        """
+        Close running entries of every user once they pass max_duration_seconds,
+        capping them at the Pomodoro length. Works in committed batches and
+        skips rows a request is currently writing. Returns the number of
+        entries closed; 0 when another sweeper already holds the lock.
+        """
+        db = self._get_db()
+        closed = 0
+        while True:
+            locked = db.execute(
+                "SELECT pg_try_advisory_xact_lock(%s) AS locked", (TIMER_SWEEP_LOCK_ID,)
+            ).fetchone()["locked"]
+            if not locked:
+                db.rollback()
+                break
+            count = db.execute(
+                """
+                WITH overdue AS (
+                    SELECT id
+                    FROM time_entries
+                    WHERE ended_at IS NULL
+                      AND started_at < NOW() - INTERVAL '1 second' * %s
+                    ORDER BY started_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ),
+                closed AS (
+                    UPDATE time_entries te
+                    SET ended_at = te.started_at + INTERVAL '1 second' * %s
+                    FROM overdue
+                    WHERE te.id = overdue.id
+                    RETURNING te.user_id, te.started_at, te.ended_at
+                ),
+                invalidated AS (
+                """
+                + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="closed")
+                + """
+                ),
+                bumped AS (
+                    UPDATE "user"
+                    SET data_version = data_version + 1
+                    WHERE id IN (SELECT user_id FROM closed)
+                )
+                SELECT COUNT(*) AS closed FROM closed
+                """,
+                (max_duration_seconds, batch_size, max_duration_seconds),
+            ).fetchone()["closed"]
+            db.commit()
+            closed += count
+            if count < batch_size:
+                break
+        return closed
 
     def delete_task(self, task_id):
+        self.delete_tasks([task_id])
+
+    def delete_tasks(self, task_ids):
         db = self._get_db()
         user_id = self._require_user_id()
+        self._lock_daily_rollups(db, user_id)
+        owned_ids = [
+            row["id"]
+            for row in db.execute(
+                "SELECT id FROM tasks WHERE id = ANY(%s) AND user_id = %s FOR UPDATE",
+                (list(task_ids), user_id),
+            ).fetchall()
+        ]
+        if not owned_ids:
+            db.rollback()
+            return
         db.execute(
-            "DELETE FROM time_entries WHERE task_id = %s AND user_id = %s",
-            (task_id, user_id),
+            """
+            WITH removed AS (
+                DELETE FROM time_entries
+                WHERE task_id = ANY(%s) AND user_id = %s
+                RETURNING user_id, started_at, ended_at
+            )
+            """
+            + INVALIDATE_DAILY_ROLLUPS_SQL.format(changed="removed"),
+            (owned_ids, user_id),
+        )
+        db.execute("DELETE FROM task_labels WHERE task_id = ANY(%s)", (owned_ids,))
+        db.execute("DELETE FROM task_daily_checks WHERE task_id = ANY(%s)", (owned_ids,))
+        db.execute("DELETE FROM tasks WHERE id = ANY(%s)", (owned_ids,))
+        self._commit(db)
+
+    def _time_entry_window(self, start_iso, end_iso, prefix=""):
+        """Overlap predicate and parameters for entries in [start_iso, end_iso).
+
+        Windows that reach into the last recent_window_days keep the plain
+        btree comparison; older ones add the range overlap.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.recent_window_days)
+        window_end = datetime.fromisoformat(end_iso)
+        if window_end.tzinfo is None:
+            # Naive timestamps are UTC, like the session time zone.
+            window_end = window_end.replace(tzinfo=timezone.utc)
+        use_range = window_end < cutoff
+        return (
+            _time_entry_overlap_sql(prefix, use_range),
+            _time_entry_overlap_params(start_iso, end_iso, use_range),
         )
-        db.execute("DELETE FROM task_labels WHERE task_id = %s", (task_id,))
-        db.execute("DELETE FROM task_daily_checks WHERE task_id = %s", (task_id,))
-        db.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        db.commit()
 
     def fetch_time_entries_between(self, start_iso, end_iso):
         db = self._get_db()
         user_id = self._require_user_id()
+        window_sql, window_params = self._time_entry_window(start_iso, end_iso)
         return db.execute(
-            """
+            f"""
             SELECT id, task_id, started_at, ended_at
             FROM time_entries
             WHERE user_id = %s
-              AND started_at < %s
-              AND (ended_at IS NULL OR ended_at > %s)
+              AND {window_sql}
             """,
-            (user_id, end_iso, start_iso),
+            (user_id, *window_params),
         ).fetchall()
 
     def fetch_time_entries_with_projects_between(self, start_iso, end_iso):
         db = self._get_db()
         user_id = self._require_user_id()
+        window_sql, window_params = self._time_entry_window(start_iso, end_iso, "te.")
         return db.execute(
-            """
+            f"""
             SELECT te.id, te.task_id, te.started_at, te.ended_at,
                    t.project_id, p.name AS project_name
             FROM time_entries te
@@ -2451,34 +3488,34 @@ class PostgresTaskRepository:
             LEFT JOIN projects p ON p.id = t.project_id
             WHERE te.user_id = %s
               AND t.user_id = %s
-              AND te.started_at < %s
-              AND (te.ended_at IS NULL OR te.ended_at > %s)
+              AND {window_sql}
             """,
-            (user_id, user_id, end_iso, start_iso),
+            (user_id, user_id, *window_params),
         ).fetchall()
 
     def fetch_time_entries_with_tasks_between(self, start_iso, end_iso):
         db = self._get_db()
         user_id = self._require_user_id()
+        window_sql, window_params = self._time_entry_window(start_iso, end_iso, "te.")
         return db.execute(
-            """
+            f"""
             SELECT te.id, te.task_id, te.started_at, te.ended_at,
                    t.name AS task_name
             FROM time_entries te
             JOIN tasks t ON t.id = te.task_id
             WHERE te.user_id = %s
               AND t.user_id = %s
-              AND te.started_at < %s
-              AND (te.ended_at IS NULL OR te.ended_at > %s)
+              AND {window_sql}
             """,
-            (user_id, user_id, end_iso, start_iso),
+            (user_id, user_id, *window_params),
         ).fetchall()
 
     def fetch_time_entries_with_labels_between(self, start_iso, end_iso):
         db = self._get_db()
         user_id = self._require_user_id()
+        window_sql, window_params = self._time_entry_window(start_iso, end_iso, "te.")
         return db.execute(
-            """
+            f"""
             SELECT te.id, te.task_id, te.started_at, te.ended_at,
                    l.name AS label_name
             FROM time_entries te
@@ -2486,17 +3523,137 @@ class PostgresTaskRepository:
             JOIN labels l ON l.id = tl.label_id
             WHERE te.user_id = %s
               AND l.user_id = %s
-              AND te.started_at < %s
-              AND (te.ended_at IS NULL OR te.ended_at > %s)
+              AND {window_sql}
             """,
-            (user_id, user_id, end_iso, start_iso),
+            (user_id, user_id, *window_params),
         ).fetchall()
 
-    def fetch_time_entries_with_task_details_between(self, start_iso, end_iso):
+    def fetch_report_task_details(self, task_ids):
+        """Details the reports need for each of task_ids.
+
+        Each row has the task and project (task_owned is false when the task
+        belongs to another user) and the task's labels as a list of
+        {"id", "name", "color"} ordered newest first.
+        """
+        if not task_ids:
+            return []
+        db = self._get_db()
+        user_id = self._require_user_id()
+        return db.execute(
+            """
+            WITH ids AS (
+                SELECT DISTINCT unnest(%s::int[]) AS task_id
+            ),
+            task_label_lists AS (
+                SELECT tl.task_id,
+                       json_agg(
+                           json_build_object('id', l.id, 'name', l.name, 'color', l.color)
+                           ORDER BY l.created_at DESC
+                       ) AS labels
+                FROM task_labels tl
+                JOIN labels l ON l.id = tl.label_id
+                WHERE l.user_id = %s
+                  AND tl.task_id IN (SELECT task_id FROM ids)
+                GROUP BY tl.task_id
+            )
+            SELECT ids.task_id,
+                   t.id IS NOT NULL AS task_owned,
+                   t.name AS task_name, t.status AS task_status,
+                   t.project_id, p.name AS project_name,
+                   COALESCE(tll.labels, '[]'::json) AS labels
+            FROM ids
+            LEFT JOIN tasks t ON t.id = ids.task_id AND t.user_id = %s
+            LEFT JOIN projects p ON p.id = t.project_id
+            LEFT JOIN task_label_lists tll ON tll.task_id = ids.task_id
+            """,
+            (list(task_ids), user_id, user_id),
+        ).fetchall()
+
+    def fetch_time_daily_rollups(self, timezone_name, start_date, end_date):
+        """Stored rollup rows for local dates start_date..end_date (inclusive).
+
+        Rows computed under a different timezone are ignored.
+        """
         db = self._get_db()
         user_id = self._require_user_id()
         return db.execute(
             """
+            SELECT local_date, task_id, seconds, last_started_at
+            FROM time_daily_rollups
+            WHERE user_id = %s AND timezone = %s
+              AND local_date BETWEEN %s AND %s
+            """,
+            (user_id, timezone_name, start_date, end_date),
+        ).fetchall()
+
+    def save_time_daily_rollups(self, timezone_name, days, data_version):
+        """Replace the rollups of whole days, unless the user's data moved on.
+
+        days maps a local date to (merged seconds, {task_id: (seconds,
+        last_started_at)}); the merged total is stored under
+        ROLLUP_DAY_TOTAL_TASK_ID. data_version is the user's version as read
+        before the entries were fetched. Under the exclusive rollup lock, a
+        different version means a write may have changed those entries since,
+        and nothing is stored. Returns whether the rollups were stored.
+        """
+        if not days:
+            return False
+        db = self._get_db()
+        user_id = self._require_user_id()
+        db.execute(
+            "SELECT pg_advisory_xact_lock(%s::int, %s::int)",
+            (DAILY_ROLLUPS_LOCK_ID, user_id),
+        )
+        current = db.execute(
+            'SELECT data_version FROM "user" WHERE id = %s', (user_id,)
+        ).fetchone()
+        if current is None or current["data_version"] != data_version:
+            db.commit()
+            return False
+        local_dates, task_ids, seconds_list, started_list = [], [], [], []
+        for local_date, (seconds, tasks) in days.items():
+            local_dates.append(local_date)
+            task_ids.append(ROLLUP_DAY_TOTAL_TASK_ID)
+            seconds_list.append(seconds)
+            started_list.append(None)
+            for task_id, (task_seconds, last_started_at) in tasks.items():
+                local_dates.append(local_date)
+                task_ids.append(task_id)
+                seconds_list.append(task_seconds)
+                started_list.append(last_started_at)
+        db.execute(
+            "DELETE FROM time_daily_rollups WHERE user_id = %s AND local_date = ANY(%s)",
+            (user_id, list(days)),
+        )
+        db.execute(
+            """
+            INSERT INTO time_daily_rollups
+                (user_id, local_date, task_id, seconds, last_started_at, timezone)
+            SELECT %s, r.local_date, r.task_id, r.seconds, r.last_started_at, %s
+            FROM unnest(%s::date[], %s::int[], %s::int[], %s::timestamptz[])
+                AS r(local_date, task_id, seconds, last_started_at)
+            ON CONFLICT (user_id, local_date, task_id) DO UPDATE
+            SET seconds = EXCLUDED.seconds,
+                last_started_at = EXCLUDED.last_started_at,
+                timezone = EXCLUDED.timezone
+            """,
+            (user_id, timezone_name, local_dates, task_ids, seconds_list, started_list),
+        )
+        db.commit()
+        return True
+
+    def delete_time_daily_rollups(self):
+        db = self._get_db()
+        user_id = self._require_user_id()
+        db.execute("DELETE FROM time_daily_rollups WHERE user_id = %s", (user_id,))
+        db.commit()
+
+    def fetch_time_entries_with_task_details_between(self, start_iso, end_iso):
+        db = self._get_db()
+        user_id = self._require_user_id()
+        window_sql, window_params = self._time_entry_window(start_iso, end_iso, "te.")
+        return db.execute(
+            f"""
             SELECT te.id, te.task_id, te.started_at, te.ended_at,
                    t.name AS task_name, t.status AS task_status, p.name AS project_name
             FROM time_entries te
@@ -2504,9 +3661,8 @@ class PostgresTaskRepository:
             LEFT JOIN projects p ON p.id = t.project_id
             WHERE te.user_id = %s
               AND t.user_id = %s
-              AND te.started_at < %s
-              AND (te.ended_at IS NULL OR te.ended_at > %s)
+              AND {window_sql}
             ORDER BY te.started_at DESC
             """,
-            (user_id, user_id, end_iso, start_iso),
+            (user_id, user_id, *window_params),
         ).fetchall()
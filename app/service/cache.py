@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.metrics import (
+    record_cache_delete,
+    record_cache_hit,
+    record_cache_miss,
+    record_cache_set,
+)
+
+
+class TTLCache:
+    """Thread-safe, size-bounded cache whose entries expire after a TTL.
+
+    When full, the least recently used entry is evicted. Lookups are recorded
+    through the shared cache metrics, labelled with the cache's name.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, name, max_size=1024, ttl_seconds=300.0):
+        self.name = name
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    record_cache_hit(self.name)
+                    return value
+                del self._entries[key]
+        record_cache_miss(self.name)
+        return default
+
+    def __contains__(self, key):
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def set(self, key, value=True):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        record_cache_set(self.name)
+
+    def delete(self, key):
+        with self._lock:
+            removed = self._entries.pop(key, self._MISSING) is not self._MISSING
+        if removed:
+            record_cache_delete(self.name)
+        return removed
+
+    def delete_where(self, predicate):
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        for _ in keys:
+            record_cache_delete(self.name)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
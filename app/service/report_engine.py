@@ -0,0 +1,273 @@
+from bisect import bisect_right
+
+from app.service import time_analytics
+
+DISTRIBUTION_GROUPS = {
+    # group_by -> (entry field, fallback name)
+    "projects": ("project_name", "Unassigned"),
+    "tasks": ("task_name", "Unnamed Task"),
+    "labels": ("labels", "Unlabeled"),
+}
+
+
+def merged_interval_seconds(intervals):
+    """Total seconds covered by (start, end) intervals, counting overlaps once."""
+    if not intervals:
+        return 0
+    normalized = [
+        (start, end)
+        for start, end in intervals
+        if start is not None and end is not None and end > start
+    ]
+    if not normalized:
+        return 0
+    if time_analytics.should_vectorize(len(normalized)):
+        starts, ends = time_analytics.interval_arrays(normalized)
+        return int(time_analytics.union_seconds(starts, ends)[0])
+    normalized.sort(key=lambda item: item[0])
+    current_start, current_end = normalized[0]
+    total_seconds = 0
+    for start, end in normalized[1:]:
+        if start <= current_end:
+            if end > current_end:
+                current_end = end
+            continue
+        total_seconds += int((current_end - current_start).total_seconds())
+        current_start, current_end = start, end
+    total_seconds += int((current_end - current_start).total_seconds())
+    return total_seconds
+
+
+class DayBuckets:
+    """Sorted, non-overlapping [start, end) windows, one per local day.
+
+    Maps an interval straight to the windows it spans with a bisect over the
+    window ends, instead of testing it against every window.
+    """
+
+    def __init__(self, bounds):
+        self.starts = [start for start, _ in bounds]
+        self.ends = [end for _, end in bounds]
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def arrays(self):
+        """The window bounds as time_analytics (starts, ends) arrays."""
+        if self._arrays is None:
+            self._arrays = time_analytics.interval_arrays(list(zip(self.starts, self.ends)))
+        return self._arrays
+
+    def overlaps(self, start, end):
+        """Yield (index, overlap_start, overlap_end) for each window the interval touches."""
+        starts = self.starts
+        ends = self.ends
+        index = bisect_right(ends, start)
+        count = len(starts)
+        while index < count and starts[index] < end:
+            overlap_start = start if start > starts[index] else starts[index]
+            overlap_end = end if end < ends[index] else ends[index]
+            if overlap_end > overlap_start:
+                yield index, overlap_start, overlap_end
+            index += 1
+
+
+def daily_totals(windows, entries):
+    """Per-window totals for time entries with naive-UTC "start" and "end".
+
+    Returns one (seconds, tasks) pair per DayBuckets window: the merged
+    seconds of every entry piece in the window, and {task_id: [seconds,
+    latest start]} where a task's seconds add up its pieces, each truncated
+    to whole seconds.
+    """
+    if time_analytics.should_vectorize(len(entries)):
+        return _daily_totals_vectorized(windows, entries)
+    pieces = [[] for _ in range(len(windows))]
+    tasks = [{} for _ in range(len(windows))]
+    for entry in entries:
+        entry_start = entry["start"]
+        task_id = entry["task_id"]
+        for index, overlap_start, overlap_end in windows.overlaps(entry_start, entry["end"]):
+            pieces[index].append((overlap_start, overlap_end))
+            seconds = int((overlap_end - overlap_start).total_seconds())
+            task = tasks[index].get(task_id)
+            if task is None:
+                tasks[index][task_id] = [seconds, entry_start]
+            else:
+                task[0] += seconds
+                if entry_start > task[1]:
+                    task[1] = entry_start
+    return [
+        (merged_interval_seconds(day_pieces), day_tasks)
+        for day_pieces, day_tasks in zip(pieces, tasks)
+    ]
+
+
+def _daily_totals_vectorized(windows, entries):
+    np = time_analytics.np
+    starts, ends = time_analytics.interval_arrays(
+        [(entry["start"], entry["end"]) for entry in entries]
+    )
+    task_ids = np.fromiter((entry["task_id"] for entry in entries), np.int64, len(entries))
+    day_starts, day_ends = windows.arrays()
+    entry_index, day_index, piece_starts, piece_ends = time_analytics.split_by_day(
+        starts, ends, day_starts, day_ends
+    )
+    day_seconds = time_analytics.union_seconds(
+        piece_starts, piece_ends, day_index, len(windows)
+    ).tolist()
+
+    tasks = [{} for _ in range(len(windows))]
+    if entry_index.size:
+        piece_tasks = task_ids[entry_index]
+        keys = day_index * (int(piece_tasks.max()) + 1) + piece_tasks
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        seconds = time_analytics.group_sums(
+            inverse, time_analytics.whole_seconds(piece_starts, piece_ends), first.size
+        )
+        latest = time_analytics.group_max(inverse, starts[entry_index], first.size)
+        for day, task_id, task_seconds, latest_start in zip(
+            day_index[first].tolist(),
+            piece_tasks[first].tolist(),
+            seconds.tolist(),
+            latest.tolist(),
+        ):
+            tasks[day][task_id] = [task_seconds, time_analytics.from_micros(latest_start)]
+    return list(zip(day_seconds, tasks))
+
+
+class RangeReport:
+    """Every aggregate the reports page needs for one date range.
+
+    Built from per-day totals, as returned by daily_totals or read back from
+    time_daily_rollups, plus the details of the tasks they mention (see
+    fetch_report_task_details). Tasks are visited most recently started
+    first, which is the order ties keep when totals are sorted.
+    """
+
+    def __init__(self, days):
+        self.running_task_ids = set()
+        self._days = [
+            {"date": day.isoformat(), "label": day.strftime("%d %b"), "seconds": 0}
+            for day in days
+        ]
+        self._task_seconds = {}
+        self._task_started = {}
+        self._totals = {group_by: {} for group_by in DISTRIBUTION_GROUPS}
+        self._projects = {}
+
+    def add_day(self, index, seconds, tasks):
+        self._days[index]["seconds"] += seconds
+        for task_id, (task_seconds, started_at) in tasks.items():
+            self._task_seconds[task_id] = self._task_seconds.get(task_id, 0) + task_seconds
+            latest = self._task_started.get(task_id)
+            if latest is None or started_at > latest:
+                self._task_started[task_id] = started_at
+        return self
+
+    def task_ids(self):
+        return list(self._task_seconds)
+
+    def add_task_details(self, rows, running_task_ids):
+        """Aggregate the task totals once the tasks' details are known."""
+        self.running_task_ids = running_task_ids
+        details = {row["task_id"]: row for row in rows}
+        task_ids = sorted(
+            self._task_seconds, key=lambda task_id: self._task_started[task_id], reverse=True
+        )
+        for task_id in task_ids:
+            detail = details.get(task_id)
+            if detail is None:
+                continue
+            seconds = self._task_seconds[task_id]
+            for label in detail["labels"]:
+                self._add_total("labels", label["name"], seconds)
+
+            # Time on tasks that belong to someone else only counts towards
+            # the daily summary and labels.
+            if not detail["task_owned"]:
+                continue
+
+            project_name = self._add_total("projects", detail["project_name"], seconds)
+            self._add_total("tasks", detail["task_name"], seconds)
+            self._add_task_total(detail, project_name, seconds)
+        return self
+
+    def _add_total(self, group_by, name, seconds):
+        name = name or DISTRIBUTION_GROUPS[group_by][1]
+        totals = self._totals[group_by]
+        totals[name] = totals.get(name, 0) + seconds
+        return name
+
+    def _add_task_total(self, detail, project_name, seconds):
+        project = self._projects.setdefault(
+            project_name,
+            {"name": project_name, "total_seconds": 0, "tasks": {}},
+        )
+        project["total_seconds"] += seconds
+        task_id = detail["task_id"]
+        task = project["tasks"].setdefault(
+            task_id,
+            {
+                "id": task_id,
+                "name": detail["task_name"] or DISTRIBUTION_GROUPS["tasks"][1],
+                "total_seconds": 0,
+                "labels": detail["labels"],
+                "is_running": task_id in self.running_task_ids,
+            },
+        )
+        task["total_seconds"] += seconds
+
+    def summary(self):
+        buckets = [dict(day) for day in self._days]
+        max_seconds = max((bucket["seconds"] for bucket in buckets), default=0)
+        for bucket in buckets:
+            bucket["percent"] = (
+                int((bucket["seconds"] / max_seconds) * 100)
+                if max_seconds
+                else 0
+            )
+        return buckets
+
+    def distribution(self, group_by, name_key="label"):
+        totals = self._totals.get(group_by, self._totals["projects"])
+        total_seconds = sum(totals.values())
+        distribution = []
+        for name, seconds in totals.items():
+            percent = (seconds / total_seconds) * 100 if total_seconds else 0
+            distribution.append(
+                {
+                    name_key: name,
+                    "seconds": seconds,
+                    "percent": percent,
+                }
+            )
+        distribution.sort(key=lambda item: item["seconds"], reverse=True)
+        return distribution, total_seconds
+
+    def project_totals(self):
+        project_list = []
+        for project in self._projects.values():
+            tasks = [dict(task) for task in project["tasks"].values()]
+            tasks.sort(key=lambda item: item["total_seconds"], reverse=True)
+            project_list.append(
+                {
+                    "name": project["name"],
+                    "total_seconds": project["total_seconds"],
+                    "tasks": tasks,
+                }
+            )
+        project_list.sort(key=lambda item: item["total_seconds"], reverse=True)
+        return project_list
+
+    def active_project_count(self):
+        return len(self._projects)
+
+    def active_task_ids(self):
+        return {
+            task_id
+            for project in self._projects.values()
+            for task_id in project["tasks"]
+        }
@@ -0,0 +1,60 @@
+import functools
+import logging
+import os
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+REQUEST_MEMO_ENABLED = os.getenv("REQUEST_MEMO_ENABLED", "1") == "1"
+
+
+def request_memoized(method):
+    """Reuse a service read's result for the rest of the current request.
+
+    Results are keyed by method, arguments and user, and are dropped as soon
+    as the repository commits a write (g.write_generation moves on). The
+    same object is returned to every caller, so callers must not mutate it.
+    Calls outside a request, or with unhashable arguments, are not memoized.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not REQUEST_MEMO_ENABLED or not has_request_context():
+            return method(self, *args, **kwargs)
+        key = (name, g.get("repository_user_id"), args, tuple(sorted(kwargs.items())))
+        memo = g.get("request_memo")
+        if memo is None:
+            memo = g.request_memo = {}
+        try:
+            cached = memo.get(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        if cached is not None and cached[0] == g.get("write_generation", 0):
+            hits = g.get("request_memo_hits")
+            if hits is None:
+                hits = g.request_memo_hits = {}
+            hits[name] = hits.get(name, 0) + 1
+            return cached[1]
+        result = method(self, *args, **kwargs)
+        # Read the generation after the call: a read that writes (e.g. the
+        # timer rollover) returns data that is already current.
+        memo[key] = (g.get("write_generation", 0), result)
+        return result
+
+    return wrapper
+
+
+def register_request_memo(app):
+    @app.teardown_request
+    def log_request_memo_hits(error):
+        hits = g.pop("request_memo_hits", None)
+        g.pop("request_memo", None)
+        if hits:
+            logger.info(
+                "request memo request_id=%s saved=%s calls=%s",
+                g.get("request_id", "-"),
+                sum(hits.values()),
+                ",".join(f"{name}:{count}" for name, count in sorted(hits.items())),
+            )
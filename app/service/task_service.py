@@ -1,12 +1,30 @@
 import calendar
+import os
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+from app.repository.postgres_repository import MAX_TIMER_SECONDS, ROLLUP_DAY_TOTAL_TASK_ID
+from app.service.cache import TTLCache
+from app.service.report_engine import (
+    DayBuckets,
+    RangeReport,
+    daily_totals,
+    merged_interval_seconds,
+)
+from app.service.request_memo import request_memoized
+
 class TaskService:
     DEMO_SEED_LOCK_ID = 922337203685477500
     def __init__(self, repository):
         self.repository = repository
+        # Users whose account row and default project are known to exist, so
+        # the per-request setup can be skipped.
+        self._user_setup_cache = TTLCache(
+            "user_setup",
+            max_size=int(os.getenv("USER_SETUP_CACHE_MAX_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("USER_SETUP_CACHE_TTL_SECONDS", "300")),
+        )
 
     def _coerce_int(self, value):
         if value is None or str(value).strip() == "":
@@ -86,14 +104,29 @@ class TaskService:
     def _parse_datetime(self, value):
         if not value:
             return None
-        try:
-            parsed = datetime.fromisoformat(value)
-        except ValueError:
-            return None
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None
         if parsed.tzinfo is None:
             return parsed
         return parsed.astimezone(timezone.utc).replace(tzinfo=None)
 
+    def _entry_bounds(self, entry, now=None):
+        """Return a time entry's (start, end) as naive UTC datetimes.
+
+        Running entries end now, capped at MAX_TIMER_SECONDS so an overdue
+        timer counts the same whether or not the sweeper has closed it yet.
+        """
+        entry_start = self._parse_datetime(entry["started_at"])
+        if entry["ended_at"]:
+            return entry_start, self._parse_datetime(entry["ended_at"])
+        now = now or datetime.utcnow()
+        return entry_start, min(now, entry_start + timedelta(seconds=MAX_TIMER_SECONDS))
+
     def _format_occurrence_label(self, dt, now):
         if not dt:
             return "Not scheduled"
@@ -244,6 +277,34 @@ class TaskService:
         self.repository.set_setting("notifications_title", title)
         self.repository.set_setting("notifications_message", message)
 
+    @request_memoized
+    def _data_version_state(self):
+        return self.repository.fetch_data_version()
+
+    def data_version(self):
+        row = self._data_version_state()
+        return int(row["data_version"]) if row else 0
+
+    def data_etag(self, rolling_window=False):
+        """Weak ETag value for the user's data as it is now, or None.
+
+        Combines the user's data_version with the local date, since payloads
+        roll over at midnight. While a timer is running, payloads change with
+        the clock, so there is no ETag. With rolling_window, for payloads that
+        carry rolling 24h totals, the ETag also changes when an entry starts
+        leaving the window, and there is none while one is leaving it.
+        """
+        row = self._data_version_state()
+        if row is None or row["timer_running"]:
+            return None
+        etag = f"{row['data_version']}-{self.current_local_date().isoformat()}"
+        if rolling_window:
+            if row["rolling_window_straddled"]:
+                return None
+            if row["rolling_window_start"] is not None:
+                etag = f"{etag}-{row['rolling_window_start']}"
+        return etag
+
     def get_timezone_name(self):
         return self._get_timezone()[0]
 
@@ -253,7 +314,12 @@ class TaskService:
             ZoneInfo(tz_name)
         except Exception:
             tz_name = "UTC"
+        previous_tz_name, _ = self._get_timezone()
         self.repository.set_setting("timezone", tz_name)
+        if tz_name != previous_tz_name:
+            # Rollups are per local day; they rebuild under the new timezone
+            # as reports read them.
+            self.repository.delete_time_daily_rollups()
 
     # ----------------------
     # Profile settings
@@ -278,6 +344,7 @@ class TaskService:
         _, tz = self._get_timezone()
         return datetime.now(tz).date()
 
+    @request_memoized
     def list_reminders(self):
         tz_name, tz = self._get_timezone()
         now = datetime.now(tz)
@@ -411,6 +478,7 @@ class TaskService:
     def delete_reminder(self, reminder_id):
         self.repository.delete_reminder(int(reminder_id))
 
+    @request_memoized
     def list_todos_for_today(self):
         today = self.current_local_date().isoformat()
         todos = [dict(row) for row in self.repository.fetch_todos_for_date(today)]
@@ -437,60 +505,47 @@ class TaskService:
     def delete_todo(self, todo_id):
         self.repository.delete_todo(int(todo_id))
 
-    def _local_day_bounds(self, day):
-        _, tz = self._get_timezone()
+    def _local_day_bounds(self, day, tz=None):
+        if tz is None:
+            _, tz = self._get_timezone()
         start_local = datetime.combine(day, datetime.min.time(), tzinfo=tz)
         end_local = start_local + timedelta(days=1)
         start_utc = start_local.astimezone(timezone.utc).replace(tzinfo=None)
         end_utc = end_local.astimezone(timezone.utc).replace(tzinfo=None)
         return start_utc, end_utc
 
+    def _local_day_buckets(self, start_date, end_date):
+        """(day, start_utc, end_utc) for every local day from start_date to end_date."""
+        _, tz = self._get_timezone()
+        buckets = []
+        for day_offset in range((end_date - start_date).days + 1):
+            day = start_date + timedelta(days=day_offset)
+            buckets.append((day, *self._local_day_bounds(day, tz)))
+        return buckets
+
     def _merged_interval_seconds(self, intervals):
-        if not intervals:
-            return 0
-        normalized = [
-            (start, end)
-            for start, end in intervals
-            if start is not None and end is not None and end > start
-        ]
-        if not normalized:
-            return 0
-        normalized.sort(key=lambda item: item[0])
-        current_start, current_end = normalized[0]
-        total_seconds = 0
-        for start, end in normalized[1:]:
-            if start <= current_end:
-                if end > current_end:
-                    current_end = end
-                continue
-            total_seconds += int((current_end - current_start).total_seconds())
-            current_start, current_end = start, end
-        total_seconds += int((current_end - current_start).total_seconds())
-        return total_seconds
+        return merged_interval_seconds(intervals)
 
     def _rollover_running_entries(self):
-        today = self.current_local_date()
-        today_start, _ = self._local_day_bounds(today)
-        running_entries = self.repository.fetch_running_time_entries()
-        for entry in running_entries:
-            started_at = self._parse_datetime(entry["started_at"])
-            end_at = None
-            if started_at < today_start:
-                end_at = today_start
-            pomodoro_end = started_at + timedelta(minutes=25)
-            if datetime.utcnow() >= pomodoro_end:
-                end_at = pomodoro_end if end_at is None else min(end_at, pomodoro_end)
-            if end_at:
-                self.repository.stop_time_entry(entry["id"], end_at.isoformat())
+        today_start, _ = self._local_day_bounds(self.current_local_date())
+        self.repository.rollover_running_time_entries(today_start.isoformat())
+
+    def _running_task_ids(self):
+        return {
+            timer["task_id"]
+            for timer in self.repository.fetch_running_timers()
+            if not timer["is_overdue"]
+        }
+
+    def _running_status_map(self, task_ids):
+        running_task_ids = self._running_task_ids()
+        return {task_id: task_id in running_task_ids for task_id in task_ids}
 
     def _hydrate_tasks(self, tasks, log_date):
         task_ids = [task["id"] for task in tasks]
-        labels_map = self.repository.fetch_task_labels_map(task_ids)
-        checked_today = self.repository.fetch_task_daily_checks_for_date(
-            task_ids, log_date
+        labels_map, checked_today, check_counts, goals_map = (
+            self.repository.fetch_task_hydration(task_ids, log_date)
         )
-        check_counts = self.repository.fetch_task_daily_check_counts(task_ids)
-        goals_map = self.repository.fetch_task_goals_map(task_ids)
         hydrated = []
         for task in tasks:
             task_id = task["id"]
@@ -516,7 +571,10 @@ class TaskService:
     def init_db(self):
         self.repository.init_db()
 
-    def ensure_user_setup(self, email):
+    def ensure_user_setup(self, email, user_id=None):
+        cache_key = (int(user_id), email) if user_id is not None else None
+        if cache_key is not None and cache_key in self._user_setup_cache:
+            return
         # Ensure user exists in the database first
         self.repository.ensure_user(email)
         # Then create default project
@@ -525,6 +583,16 @@ class TaskService:
         )
         if default_project_id:
             self.repository.backfill_tasks_project(default_project_id)
+        if cache_key is not None:
+            self._user_setup_cache.set(cache_key)
+
+    def _forget_user_setup(self):
+        # Run the full setup again on the user's next request, e.g. after the
+        # default project was removed or a task was left without a project.
+        user_id = self.repository.current_user_id()
+        if user_id is None:
+            return
+        self._user_setup_cache.delete_where(lambda key: key[0] == user_id)
 
     def seed_demo_from_file(self, force=False, email=None):
         if self.repository.user_id is None:
@@ -537,6 +605,7 @@ class TaskService:
                 return False, "User already has data. Seed skipped."
             if force:
                 self.repository.clear_user_data()
+                self._forget_user_setup()
             root = Path(__file__).resolve().parents[2]
             template_path = root / "scripts" / "demo_seed.sql"
             if not template_path.exists():
@@ -548,6 +617,7 @@ class TaskService:
         finally:
             self.repository.advisory_unlock(self.DEMO_SEED_LOCK_ID)
 
+    @request_memoized
     def list_tasks(self):
         self._rollover_running_entries()
         now_utc = datetime.utcnow()
@@ -560,6 +630,24 @@ class TaskService:
         tasks = self.repository.fetch_tasks(now_ts, rolling_start_ts, day_start_ts)
         return self._hydrate_tasks(tasks, log_date)
 
+    def tasks_payload_json(self):
+        """The GET /api/tasks payload as JSON text, built inside Postgres.
+
+        Covers the same tasks and time window as list_tasks_for_today.
+        """
+        self._rollover_running_entries()
+        now_utc = datetime.utcnow()
+        today = self.current_local_date()
+        day_start, _ = self._local_day_bounds(today)
+        now_ts = int(now_utc.timestamp())
+        return self.repository.fetch_tasks_payload_json(
+            now_ts,
+            now_ts - 24 * 60 * 60,
+            int(day_start.timestamp()),
+            today.isoformat(),
+        )
+
+    @request_memoized
     def list_tasks_by_project(self, project_id):
         now_utc = datetime.utcnow()
         today = self.current_local_date()
@@ -576,6 +664,24 @@ class TaskService:
         )
         return self._hydrate_tasks(tasks, log_date)
 
+    def list_tasks_by_ids(self, task_ids):
+        """The given tasks, hydrated like list_tasks; unknown ids are skipped."""
+        self._rollover_running_entries()
+        now_utc = datetime.utcnow()
+        today = self.current_local_date()
+        day_start, _ = self._local_day_bounds(today)
+        log_date = today.isoformat()
+        now_ts = int(now_utc.timestamp())
+        day_start_ts = int(day_start.timestamp())
+        rolling_start_ts = now_ts - 24 * 60 * 60
+        tasks = self.repository.fetch_tasks_by_ids(
+            task_ids,
+            now_ts,
+            rolling_start_ts,
+            day_start_ts,
+        )
+        return self._hydrate_tasks(tasks, log_date)
+
     def list_tasks_for_today(self):
         tasks = self.list_tasks()
         active_tasks = []
@@ -605,6 +711,8 @@ class TaskService:
             task_id = self.repository.create_task(
                 name, datetime.utcnow().isoformat(), project_value, priority
             )
+            if project_value is None:
+                self._forget_user_setup()
             for label_id in label_ids or []:
                 self.repository.add_label_to_task(task_id, int(label_id))
             if goal_id:
@@ -624,11 +732,11 @@ class TaskService:
         if goal_id is not None:
             self.repository.set_task_goal(int(task_id), int(goal_id) if goal_id else None)
 
+    @request_memoized
     def list_projects(self):
         projects = self.repository.fetch_projects()
         project_ids = [project["id"] for project in projects]
-        labels_map = self.repository.fetch_project_labels_map(project_ids)
-        goals_map = self.repository.fetch_project_goals_map(project_ids)
+        labels_map, goals_map = self.repository.fetch_project_hydration(project_ids)
         return [
             {
                 **dict(project),
@@ -644,12 +752,12 @@ class TaskService:
             for project in projects
         ]
 
+    @request_memoized
     def get_project(self, project_id):
         project = self.repository.fetch_project(project_id)
         if project is None:
             return None
-        labels_map = self.repository.fetch_project_labels_map([project["id"]])
-        goals_map = self.repository.fetch_project_goals_map([project["id"]])
+        labels_map, goals_map = self.repository.fetch_project_hydration([project["id"]])
         project_labels = labels_map.get(project["id"], [])
         project_goals = goals_map.get(project["id"], [])
         return {
@@ -682,47 +790,23 @@ class TaskService:
 
     def delete_project(self, project_id):
         self.repository.delete_project(project_id)
+        self._forget_user_setup()
 
     def summary_by_days(self, days):
         days = int(days)
         today = self.current_local_date()
         start_date = today - timedelta(days=days - 1)
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(today)
-        entries = self.repository.fetch_time_entries_between(
-            start_day.isoformat(), end_day.isoformat()
-        )
-
-        buckets = []
-        for day_offset in range(days):
-            day = start_date + timedelta(days=day_offset)
-            day_start, day_end = self._local_day_bounds(day)
-            buckets.append(
-                {
-                    "date": day.isoformat(),
-                    "label": day.strftime("%d %b"),
-                    "start": day_start,
-                    "end": day_end,
-                    "seconds": 0,
-                    "intervals": [],
-                }
-            )
-
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else datetime.utcnow()
+        day_buckets = self._local_day_buckets(start_date, today)
+        buckets = [
+            {
+                "date": day.isoformat(),
+                "label": day.strftime("%d %b"),
+                "seconds": seconds,
+            }
+            for (day, _, _), (seconds, _) in zip(
+                day_buckets, self._daily_time_totals(day_buckets)
             )
-            for bucket in buckets:
-                overlap_start = max(entry_start, bucket["start"])
-                overlap_end = min(entry_end, bucket["end"])
-                if overlap_end > overlap_start:
-                    bucket["intervals"].append((overlap_start, overlap_end))
-
-        for bucket in buckets:
-            bucket["seconds"] = self._merged_interval_seconds(bucket["intervals"])
+        ]
         max_seconds = max((bucket["seconds"] for bucket in buckets), default=0)
         for bucket in buckets:
             bucket["percent"] = (
@@ -730,222 +814,114 @@ class TaskService:
                 if max_seconds
                 else 0
             )
-            del bucket["intervals"]
-            del bucket["start"]
-            del bucket["end"]
 
         return buckets
 
-    def summary_by_range(self, start_date, end_date):
-        self._rollover_running_entries()
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
-
-        entries = self.repository.fetch_time_entries_between(
-            start_day.isoformat(), end_day.isoformat()
-        )
+    def _daily_time_totals(self, day_buckets):
+        """(merged seconds, {task_id: [seconds, latest start]}) for each local day.
 
-        days = (end_date - start_date).days + 1
-        buckets = []
-        for day_offset in range(days):
-            day = start_date + timedelta(days=day_offset)
-            day_start, day_end = self._local_day_bounds(day)
-            buckets.append(
-                {
-                    "date": day.isoformat(),
-                    "label": day.strftime("%d %b"),
-                    "start": day_start,
-                    "end": day_end,
-                    "seconds": 0,
-                    "intervals": [],
-                }
+        Days before today are read from time_daily_rollups; the ones not
+        stored yet are computed from time entries and stored. Today and later
+        days are always computed live.
+        """
+        tz_name, _ = self._get_timezone()
+        today = self.current_local_date()
+        totals = {}
+        closed_days = [day for day, _, _ in day_buckets if day < today]
+        if closed_days:
+            for row in self.repository.fetch_time_daily_rollups(
+                tz_name, closed_days[0], closed_days[-1]
+            ):
+                day_totals = totals.setdefault(row["local_date"], [0, {}])
+                if row["task_id"] == ROLLUP_DAY_TOTAL_TASK_ID:
+                    day_totals[0] = row["seconds"]
+                else:
+                    day_totals[1][row["task_id"]] = [
+                        row["seconds"],
+                        self._parse_datetime(row["last_started_at"]),
+                    ]
+
+        missing = [bucket for bucket in day_buckets if bucket[0] not in totals]
+        # Read before the entries: rollups are only stored if no write has
+        # committed since (see save_time_daily_rollups).
+        data_version = self.data_version() if missing else None
+        to_store = {}
+        now = datetime.utcnow()
+        for run in self._consecutive_day_runs(missing):
+            windows = DayBuckets([(day_start, day_end) for _, day_start, day_end in run])
+            rows = self.repository.fetch_time_entries_between(
+                run[0][1].isoformat(), run[-1][2].isoformat()
             )
+            entries = []
+            open_days = set()
+            for row in rows:
+                entry_start, entry_end = self._entry_bounds(row, now)
+                entries.append({"task_id": row["task_id"], "start": entry_start, "end": entry_end})
+                if row["ended_at"] is None:
+                    # A running entry can still change the days it touches.
+                    open_days.update(
+                        index for index, _, _ in windows.overlaps(entry_start, entry_end)
+                    )
+            for index, day_totals in enumerate(daily_totals(windows, entries)):
+                day = run[index][0]
+                totals[day] = day_totals
+                if day < today and index not in open_days:
+                    to_store[day] = day_totals
+        if to_store:
+            self.repository.save_time_daily_rollups(tz_name, to_store, data_version)
+        return [totals[day] for day, _, _ in day_buckets]
+
+    @staticmethod
+    def _consecutive_day_runs(day_buckets):
+        runs = []
+        for bucket in day_buckets:
+            if runs and bucket[0] == runs[-1][-1][0] + timedelta(days=1):
+                runs[-1].append(bucket)
+            else:
+                runs.append([bucket])
+        return runs
 
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else datetime.utcnow()
-            )
-            for bucket in buckets:
-                overlap_start = max(entry_start, bucket["start"])
-                overlap_end = min(entry_end, bucket["end"])
-                if overlap_end > overlap_start:
-                    bucket["intervals"].append((overlap_start, overlap_end))
+    @request_memoized
+    def build_range_report(self, start_date, end_date):
+        """Aggregate every report for a date range from its daily totals."""
+        self._rollover_running_entries()
+        day_buckets = self._local_day_buckets(start_date, end_date)
+        report = RangeReport([day for day, _, _ in day_buckets])
+        for index, (seconds, tasks) in enumerate(self._daily_time_totals(day_buckets)):
+            report.add_day(index, seconds, tasks)
+        task_ids = report.task_ids()
+        if not task_ids:
+            return report
+        return report.add_task_details(
+            self.repository.fetch_report_task_details(task_ids), self._running_task_ids()
+        )
 
-        for bucket in buckets:
-            bucket["seconds"] = self._merged_interval_seconds(bucket["intervals"])
-        max_seconds = max((bucket["seconds"] for bucket in buckets), default=0)
-        for bucket in buckets:
-            bucket["percent"] = (
-                int((bucket["seconds"] / max_seconds) * 100)
-                if max_seconds
-                else 0
-            )
-            del bucket["intervals"]
-            del bucket["start"]
-            del bucket["end"]
+    def report_summary_by_range(self, start_date, end_date, group_by):
+        report = self.build_range_report(start_date, end_date)
+        distribution, total_seconds = report.distribution(group_by)
+        return {
+            "summary": report.summary(),
+            "distribution": distribution,
+            "total_seconds": total_seconds,
+            "project_totals": report.project_totals(),
+            "entities": self.report_entities_by_range(start_date, end_date, report=report),
+        }
 
-        return buckets
+    def summary_by_range(self, start_date, end_date):
+        return self.build_range_report(start_date, end_date).summary()
 
     def project_distribution_by_range(self, start_date, end_date):
-        self._rollover_running_entries()
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
-        entries = self.repository.fetch_time_entries_with_projects_between(
-            start_day.isoformat(), end_day.isoformat()
+        return self.build_range_report(start_date, end_date).distribution(
+            "projects", name_key="project"
         )
 
-        totals = {}
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else datetime.utcnow()
-            )
-            overlap_start = max(entry_start, start_day)
-            overlap_end = min(entry_end, end_day)
-            if overlap_end <= overlap_start:
-                continue
-            seconds = int((overlap_end - overlap_start).total_seconds())
-            project_name = entry["project_name"] or "Unassigned"
-            totals[project_name] = totals.get(project_name, 0) + seconds
-
-        total_seconds = sum(totals.values())
-        distribution = []
-        for project_name, seconds in totals.items():
-            percent = (seconds / total_seconds) * 100 if total_seconds else 0
-            distribution.append(
-                {
-                    "project": project_name,
-                    "seconds": seconds,
-                    "percent": percent,
-                }
-            )
-        distribution.sort(key=lambda item: item["seconds"], reverse=True)
-        return distribution, total_seconds
-
     def distribution_by_range(self, start_date, end_date, group_by):
-        self._rollover_running_entries()
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
-
-        if group_by == "tasks":
-            entries = self.repository.fetch_time_entries_with_tasks_between(
-                start_day.isoformat(), end_day.isoformat()
-            )
-            name_key = "task_name"
-            fallback = "Unnamed Task"
-        elif group_by == "labels":
-            entries = self.repository.fetch_time_entries_with_labels_between(
-                start_day.isoformat(), end_day.isoformat()
-            )
-            name_key = "label_name"
-            fallback = "Unlabeled"
-        else:
-            entries = self.repository.fetch_time_entries_with_projects_between(
-                start_day.isoformat(), end_day.isoformat()
-            )
-            name_key = "project_name"
-            fallback = "Unassigned"
-
-        totals = {}
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else datetime.utcnow()
-            )
-            overlap_start = max(entry_start, start_day)
-            overlap_end = min(entry_end, end_day)
-            if overlap_end <= overlap_start:
-                continue
-            seconds = int((overlap_end - overlap_start).total_seconds())
-            label = entry[name_key] or fallback
-            totals[label] = totals.get(label, 0) + seconds
-
-        total_seconds = sum(totals.values())
-        distribution = []
-        for label, seconds in totals.items():
-            percent = (seconds / total_seconds) * 100 if total_seconds else 0
-            distribution.append(
-                {
-                    "label": label,
-                    "seconds": seconds,
-                    "percent": percent,
-                }
-            )
-        distribution.sort(key=lambda item: item["seconds"], reverse=True)
-        return distribution, total_seconds
+        return self.build_range_report(start_date, end_date).distribution(group_by)
 
     def project_totals_by_range(self, start_date, end_date):
-        self._rollover_running_entries()
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
-        entries = self.repository.fetch_time_entries_with_task_details_between(
-            start_day.isoformat(), end_day.isoformat()
-        )
-        if not entries:
-            return []
-
-        task_ids = {entry["task_id"] for entry in entries}
-        task_id_list = list(task_ids)
-        labels_map = self.repository.fetch_task_labels_map(task_id_list)
-        running_map = self.repository.fetch_tasks_running_status(task_id_list)
-
-        projects = {}
-        now = datetime.utcnow()
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else now
-            )
-            overlap_start = max(entry_start, start_day)
-            overlap_end = min(entry_end, end_day)
-            if overlap_end <= overlap_start:
-                continue
-
-            seconds = int((overlap_end - overlap_start).total_seconds())
-            project_name = entry["project_name"] or "Unassigned"
-            project = projects.setdefault(
-                project_name,
-                {"name": project_name, "total_seconds": 0, "tasks": {}},
-            )
-            project["total_seconds"] += seconds
-
-            task_id = entry["task_id"]
-            task = project["tasks"].setdefault(
-                task_id,
-                {
-                    "id": task_id,
-                    "name": entry["task_name"] or "Unnamed Task",
-                    "total_seconds": 0,
-                    "labels": labels_map.get(task_id, []),
-                    "is_running": bool(running_map.get(task_id, False)),
-                },
-            )
-            task["total_seconds"] += seconds
-
-        project_list = []
-        for project in projects.values():
-            tasks = list(project["tasks"].values())
-            tasks.sort(key=lambda item: item["total_seconds"], reverse=True)
-            project_list.append(
-                {
-                    "name": project["name"],
-                    "total_seconds": project["total_seconds"],
-                    "tasks": tasks,
-                }
-            )
-        project_list.sort(key=lambda item: item["total_seconds"], reverse=True)
-        return project_list
+        return self.build_range_report(start_date, end_date).project_totals()
 
-    def report_entities_by_range(self, start_date, end_date):
+    def report_entities_by_range(self, start_date, end_date, report=None):
         start_day, _ = self._local_day_bounds(start_date)
         _, end_day = self._local_day_bounds(end_date)
         start_iso = start_day.isoformat()
@@ -964,16 +940,13 @@ class TaskService:
         )
 
         projects_created = self.repository.fetch_projects_created_count(start_iso, end_iso)
-        project_totals = self.project_totals_by_range(start_date, end_date)
-        active_projects = len(project_totals)
+        if report is None:
+            report = self.build_range_report(start_date, end_date)
+        active_projects = report.active_project_count()
 
         tasks_created = self.repository.fetch_tasks_created_count(start_iso, end_iso)
         tasks_completed = self.repository.fetch_tasks_completed_count(start_iso, end_iso)
-        active_task_ids = {
-            task["id"]
-            for project in project_totals
-            for task in project.get("tasks", [])
-        }
+        active_task_ids = report.active_task_ids()
 
         days = max((end_date - start_date).days + 1, 1)
         habit_avg_per_day = habit_logs["total_logs"] / days
@@ -1005,24 +978,23 @@ class TaskService:
             },
         }
 
+    @request_memoized
     def list_time_entries_by_range(self, start_date, end_date):
         self._rollover_running_entries()
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
+        day_buckets = self._local_day_buckets(start_date, end_date)
+        start_day = day_buckets[0][1]
+        end_day = day_buckets[-1][2]
         entries = self.repository.fetch_time_entries_with_task_details_between(
             start_day.isoformat(), end_day.isoformat()
         )
         task_ids = {entry["task_id"] for entry in entries}
         task_id_list = list(task_ids)
         labels_map = self.repository.fetch_task_labels_map(task_id_list)
-        running_map = self.repository.fetch_tasks_running_status(task_id_list)
+        running_map = self._running_status_map(task_id_list)
 
-        days = (end_date - start_date).days + 1
         buckets = []
         today = self.current_local_date()
-        for day_offset in range(days):
-            day = start_date + timedelta(days=day_offset)
-            day_start, day_end = self._local_day_bounds(day)
+        for day, _, _ in day_buckets:
             if day == today:
                 label = "Today"
             elif day == (today - timedelta(days=1)):
@@ -1032,30 +1004,21 @@ class TaskService:
             buckets.append(
                 {
                     "label": label,
-                    "start": day_start,
-                    "end": day_end,
                     "tasks": {},
                     "total_seconds": 0,
                     "intervals": [],
                 }
             )
 
+        bounds = DayBuckets([(day_start, day_end) for _, day_start, day_end in day_buckets])
         now = datetime.utcnow()
         for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else now
-            )
+            entry_start, entry_end = self._entry_bounds(entry, now)
             entry_labels = [
                 label["name"] for label in labels_map.get(entry["task_id"], [])
             ]
-            for bucket in buckets:
-                overlap_start = max(entry_start, bucket["start"])
-                overlap_end = min(entry_end, bucket["end"])
-                if overlap_end <= overlap_start:
-                    continue
+            for index, overlap_start, overlap_end in bounds.overlaps(entry_start, entry_end):
+                bucket = buckets[index]
                 duration = int((overlap_end - overlap_start).total_seconds())
                 bucket["intervals"].append((overlap_start, overlap_end))
                 task = bucket["tasks"].get(entry["task_id"])
@@ -1097,34 +1060,38 @@ class TaskService:
                 task.pop("sort_ts", None)
             bucket["tasks"] = tasks
             bucket["total_seconds"] = self._merged_interval_seconds(bucket["intervals"])
-            bucket.pop("start", None)
-            bucket.pop("end", None)
             bucket.pop("intervals", None)
             result.append(bucket)
 
         return result
 
-    def _sum_time_entries_between(self, start_date, end_date):
-        start_day, _ = self._local_day_bounds(start_date)
-        _, end_day = self._local_day_bounds(end_date)
-        entries = self.repository.fetch_time_entries_with_task_details_between(
-            start_day.isoformat(), end_day.isoformat()
-        )
-        now = datetime.utcnow()
-        intervals = []
-        for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else now
+    def _week_time_totals(self, weeks):
+        """Merged seconds for each (start_date, end_date) range in weeks.
+
+        The daily totals of every day the ranges cover are loaded together,
+        so overlapping or repeated ranges cost no extra queries.
+        """
+        if not weeks:
+            return {}
+        _, tz = self._get_timezone()
+        days = set()
+        for start_date, end_date in weeks:
+            for day_offset in range((end_date - start_date).days + 1):
+                days.add(start_date + timedelta(days=day_offset))
+        day_buckets = [(day, *self._local_day_bounds(day, tz)) for day in sorted(days)]
+        day_seconds = {
+            day: seconds
+            for (day, _, _), (seconds, _) in zip(
+                day_buckets, self._daily_time_totals(day_buckets)
             )
-            overlap_start = max(entry_start, start_day)
-            overlap_end = min(entry_end, end_day)
-            if overlap_end <= overlap_start:
-                continue
-            intervals.append((overlap_start, overlap_end))
-        return self._merged_interval_seconds(intervals)
+        }
+        return {
+            (start_date, end_date): sum(
+                day_seconds[start_date + timedelta(days=day_offset)]
+                for day_offset in range((end_date - start_date).days + 1)
+            )
+            for start_date, end_date in weeks
+        }
 
     def current_week_range(self):
         today = self.current_local_date()
@@ -1137,24 +1104,27 @@ class TaskService:
         end_date = start_date + timedelta(days=6)
         return start_date, end_date
 
+    @request_memoized
     def list_weekly_goals(self, week_start=None, week_end=None):
         goals = self.repository.fetch_weekly_goals(
             week_start=week_start, week_end=week_end
         )
         if not goals:
             return []
-        totals_map = {}
-        goal_list = []
+        weeks = []
         for goal in goals:
             try:
                 start_date = datetime.fromisoformat(goal["week_start"]).date()
                 end_date = datetime.fromisoformat(goal["week_end"]).date()
             except ValueError:
                 continue
-            key = (start_date, end_date)
-            if key not in totals_map:
-                totals_map[key] = self._sum_time_entries_between(start_date, end_date)
-            total_seconds = totals_map[key]
+            weeks.append((goal, start_date, end_date))
+        totals_map = self._week_time_totals(
+            {(start_date, end_date) for _, start_date, end_date in weeks}
+        )
+        goal_list = []
+        for goal, start_date, end_date in weeks:
+            total_seconds = totals_map[(start_date, end_date)]
             target_seconds = int(goal["target_seconds"] or 0)
             progress = int((total_seconds / target_seconds) * 100) if target_seconds else 0
             progress = min(progress, 100)
@@ -1177,6 +1147,16 @@ class TaskService:
             )
         return goal_list
 
+    def list_weekly_goals_with_current(self, week_start, week_end):
+        """All weekly goals plus the ones for one week, from a single load."""
+        weekly_all = self.list_weekly_goals()
+        weekly_current = [
+            goal
+            for goal in weekly_all
+            if goal["week_start"] == week_start and goal["week_end"] == week_end
+        ]
+        return weekly_current, weekly_all
+
     def add_weekly_goal(
         self,
         title,
@@ -1241,6 +1221,7 @@ class TaskService:
     def delete_weekly_goal(self, goal_id):
         self.repository.delete_weekly_goal(goal_id)
 
+    @request_memoized
     def list_time_entries_for_calendar(self, start_dt, end_dt):
         self._rollover_running_entries()
         entries = self.repository.fetch_time_entries_with_task_details_between(
@@ -1257,12 +1238,7 @@ class TaskService:
         ]
         events = []
         for entry in entries:
-            entry_start = self._parse_datetime(entry["started_at"])
-            entry_end = (
-                self._parse_datetime(entry["ended_at"])
-                if entry["ended_at"]
-                else now
-            )
+            entry_start, entry_end = self._entry_bounds(entry, now)
             overlap_start = max(entry_start, start_dt)
             overlap_end = min(entry_end, end_dt)
             if overlap_end <= overlap_start:
@@ -1294,6 +1270,7 @@ class TaskService:
         return local_dt.strftime("%I:%M %p").lstrip("0")
 
     # Daily focus target (per-user, per-day)
+    @request_memoized
     def get_daily_target(self, day):
         key = f"daily_target:{day.isoformat()}"
         value = self.repository.get_setting(key)
@@ -1313,6 +1290,7 @@ class TaskService:
         key = f"daily_target:{day.isoformat()}"
         self.repository.set_setting(key, str(seconds))
 
+    @request_memoized
     def list_labels(self):
         labels = self.repository.fetch_labels()
         return [dict(label) for label in labels]
@@ -1338,145 +1316,138 @@ class TaskService:
     def add_label_to_project(self, project_id, label_id):
         self.repository.add_label_to_project(project_id, label_id)
 
+    @request_memoized
     def list_goals(self):
         goals = self.repository.fetch_goals()
         if not goals:
             return []
+        graph = self._load_goal_graph(goals)
+        today = self.current_local_date()
+        return [self._build_goal(goal, graph, today) for goal in goals]
+
+    def _load_goal_graph(self, goals):
+        """Fetch the projects, tasks, subgoals and task totals of the given goals.
+
+        Every relation is loaded once for all goals, so the number of queries
+        does not grow with the number of goals.
+        """
         goal_ids = [goal["id"] for goal in goals]
         goal_projects_map = self.repository.fetch_goal_projects(goal_ids)
         goal_tasks_map = self.repository.fetch_goal_tasks(goal_ids)
         goal_subgoals_map = self.repository.fetch_goal_subgoals(goal_ids)
 
-        project_ids = sorted(
-            {pid for ids in goal_projects_map.values() for pid in ids}
+        project_ids = {pid for ids in goal_projects_map.values() for pid in ids}
+        subgoal_project_ids = {
+            subgoal["project_id"]
+            for subgoals in goal_subgoals_map.values()
+            for subgoal in subgoals
+            if subgoal.get("project_id")
+        }
+        projects = self.repository.fetch_projects_by_ids(
+            sorted(project_ids | subgoal_project_ids)
         )
-        projects = self.repository.fetch_projects_by_ids(project_ids)
         projects_by_id = {project["id"]: dict(project) for project in projects}
 
-        task_ids = sorted({tid for ids in goal_tasks_map.values() for tid in ids})
-        if project_ids:
-            project_tasks = self.repository.fetch_tasks_by_project_ids(project_ids)
-            for task in project_tasks:
-                task_ids.append(task["id"])
-        task_ids = sorted(set(task_ids))
-
-        task_totals = self.repository.fetch_task_total_seconds(task_ids)
+        project_task_ids = {}
+        for task in self.repository.fetch_tasks_by_project_ids(sorted(project_ids)):
+            project_task_ids.setdefault(task["project_id"], []).append(task["id"])
 
-        subgoal_project_ids = sorted(
-            {
-                subgoal["project_id"]
-                for subgoals in goal_subgoals_map.values()
-                for subgoal in subgoals
-                if subgoal.get("project_id")
-            }
-        )
-        subgoal_projects = self.repository.fetch_projects_by_ids(subgoal_project_ids)
-        subgoal_projects_by_id = {
-            project["id"]: dict(project) for project in subgoal_projects
+        task_ids = {tid for ids in goal_tasks_map.values() for tid in ids}
+        for ids in project_task_ids.values():
+            task_ids.update(ids)
+        task_totals = self.repository.fetch_task_total_seconds(sorted(task_ids))
+        return {
+            "projects": goal_projects_map,
+            "tasks": goal_tasks_map,
+            "subgoals": goal_subgoals_map,
+            "projects_by_id": projects_by_id,
+            "project_task_ids": project_task_ids,
+            "task_totals": task_totals,
         }
 
-        goal_list = []
-        today = self.current_local_date()
-        for goal in goals:
-            goal_id = goal["id"]
-            direct_task_ids = goal_tasks_map.get(goal_id, [])
-            linked_project_ids = goal_projects_map.get(goal_id, [])
-            linked_task_ids = set(direct_task_ids)
-            if linked_project_ids:
-                for task in self.repository.fetch_tasks_by_project_ids(linked_project_ids):
-                    linked_task_ids.add(task["id"])
-
-            linked_task_ids = sorted(linked_task_ids)
-            total_seconds = sum(task_totals.get(task_id, 0) for task_id in linked_task_ids)
-            deadline_total_days = None
-            deadline_remaining_days = None
-            deadline_percent = None
-            target_date_value = goal["target_date"] if "target_date" in goal.keys() else None
-            if target_date_value:
+    def _build_goal(self, goal, graph, today):
+        goal_id = goal["id"]
+        direct_task_ids = graph["tasks"].get(goal_id, [])
+        linked_project_ids = graph["projects"].get(goal_id, [])
+        projects_by_id = graph["projects_by_id"]
+        task_totals = graph["task_totals"]
+        linked_task_ids = set(direct_task_ids)
+        for project_id in linked_project_ids:
+            linked_task_ids.update(graph["project_task_ids"].get(project_id, []))
+        total_seconds = sum(task_totals.get(task_id, 0) for task_id in linked_task_ids)
+        deadline_total_days = None
+        deadline_remaining_days = None
+        deadline_percent = None
+        target_date_value = goal["target_date"] if "target_date" in goal.keys() else None
+        if target_date_value:
+            try:
+                target_date = datetime.fromisoformat(target_date_value).date()
+            except ValueError:
+                target_date = None
+            if target_date:
                 try:
-                    target_date = datetime.fromisoformat(target_date_value).date()
+                    created_date = datetime.fromisoformat(goal["created_at"]).date()
                 except ValueError:
-                    target_date = None
-                if target_date:
-                    try:
-                        created_date = datetime.fromisoformat(goal["created_at"]).date()
-                    except ValueError:
-                        created_date = today
-                    total_days = max(1, (target_date - created_date).days)
-                    remaining_days = max(0, (target_date - today).days)
-                    deadline_total_days = total_days
-                    deadline_remaining_days = remaining_days
-                    deadline_percent = min(100, max(0, int((remaining_days / total_days) * 100)))
-            subgoals = []
-            for subgoal in goal_subgoals_map.get(goal_id, []):
-                project_id = subgoal.get("project_id")
-                project = (
-                    subgoal_projects_by_id.get(project_id) if project_id else None
-                )
-                subgoals.append(
-                    {
-                        **subgoal,
-                        "project_name": project["name"] if project else None,
-                    }
-                )
-            subgoals_total = len(subgoals)
-            subgoals_done = sum(1 for subgoal in subgoals if subgoal["status"] == "completed")
-            if subgoals_total:
-                progress = int((subgoals_done / subgoals_total) * 100)
-                display_status = "completed" if subgoals_done == subgoals_total else "active"
-            else:
-                target_seconds = int(goal["target_seconds"] or 0)
-                progress = int((total_seconds / target_seconds) * 100) if target_seconds else 0
-                progress = min(progress, 100)
-                display_status = goal["status"]
-            label_data = None
-            if goal.get("label_id") and goal.get("label_name"):
-                label_data = {
-                    "id": goal["label_id"],
-                    "name": goal["label_name"],
-                    "color": goal.get("label_color"),
-                }
-
-            goal_list.append(
+                    created_date = today
+                total_days = max(1, (target_date - created_date).days)
+                remaining_days = max(0, (target_date - today).days)
+                deadline_total_days = total_days
+                deadline_remaining_days = remaining_days
+                deadline_percent = min(100, max(0, int((remaining_days / total_days) * 100)))
+        subgoals = []
+        for subgoal in graph["subgoals"].get(goal_id, []):
+            project_id = subgoal.get("project_id")
+            project = projects_by_id.get(project_id) if project_id else None
+            subgoals.append(
                 {
-                    **dict(goal),
-                    "project_ids": linked_project_ids,
-                    "task_ids": direct_task_ids,
-                    "projects": [projects_by_id[pid] for pid in linked_project_ids if pid in projects_by_id],
-                    "subgoals": subgoals,
-                    "subgoals_count": subgoals_total,
-                    "subgoals_completed": subgoals_done,
-                    "total_seconds": total_seconds,
-                    "progress": progress,
-                    "display_status": display_status,
-                    "tasks_count": len(linked_task_ids),
-                    "projects_count": len(linked_project_ids),
-                    "deadline_total_days": deadline_total_days,
-                    "deadline_remaining_days": deadline_remaining_days,
-                    "deadline_percent": deadline_percent,
-                    "label": label_data,
+                    **subgoal,
+                    "project_name": project["name"] if project else None,
                 }
             )
-        return goal_list
+        subgoals_total = len(subgoals)
+        subgoals_done = sum(1 for subgoal in subgoals if subgoal["status"] == "completed")
+        if subgoals_total:
+            progress = int((subgoals_done / subgoals_total) * 100)
+            display_status = "completed" if subgoals_done == subgoals_total else "active"
+        else:
+            target_seconds = int(goal["target_seconds"] or 0)
+            progress = int((total_seconds / target_seconds) * 100) if target_seconds else 0
+            progress = min(progress, 100)
+            display_status = goal["status"]
+        label_data = None
+        if goal.get("label_id") and goal.get("label_name"):
+            label_data = {
+                "id": goal["label_id"],
+                "name": goal["label_name"],
+                "color": goal.get("label_color"),
+            }
+
+        return {
+            **dict(goal),
+            "project_ids": linked_project_ids,
+            "task_ids": direct_task_ids,
+            "projects": [projects_by_id[pid] for pid in linked_project_ids if pid in projects_by_id],
+            "subgoals": subgoals,
+            "subgoals_count": subgoals_total,
+            "subgoals_completed": subgoals_done,
+            "total_seconds": total_seconds,
+            "progress": progress,
+            "display_status": display_status,
+            "tasks_count": len(linked_task_ids),
+            "projects_count": len(linked_project_ids),
+            "deadline_total_days": deadline_total_days,
+            "deadline_remaining_days": deadline_remaining_days,
+            "deadline_percent": deadline_percent,
+            "label": label_data,
+        }
 
+    @request_memoized
     def get_goal(self, goal_id):
         goal = self.repository.fetch_goal(goal_id)
         if goal is None:
             return None
-        goals = self.list_goals()
-        for item in goals:
-            if item["id"] == goal_id:
-                return item
-        fallback = dict(goal)
-        if fallback.get("label_id") and fallback.get("label_name"):
-            fallback["label"] = {
-                "id": fallback["label_id"],
-                "name": fallback["label_name"],
-                "color": fallback.get("label_color"),
-            }
-        else:
-            fallback["label"] = None
-        return fallback
+        graph = self._load_goal_graph([goal])
+        return self._build_goal(goal, graph, self.current_local_date())
 
     def add_goal(
         self,
@@ -1607,26 +1578,39 @@ class TaskService:
         )
 
     def start_task(self, task_id):
-        if not self.repository.is_task_running(task_id):
-            self.repository.start_task(task_id, datetime.utcnow().isoformat())
+        self.repository.start_task(task_id, datetime.utcnow().isoformat())
+
+    def start_tasks(self, task_ids):
+        self.repository.start_tasks(task_ids, datetime.utcnow().isoformat())
 
     def stop_task(self, task_id):
         self.repository.stop_task(task_id, datetime.utcnow().isoformat())
 
-    def complete_overdue_timers(self, max_duration_seconds=1500):
-        """
-        Automatically complete timers that have been running for longer than max_duration_seconds.
-        Default is 1500 seconds (25 minutes for Pomodoro).
-        Returns the number of timers completed.
+    def stop_tasks(self, task_ids):
+        self.repository.stop_tasks(task_ids, datetime.utcnow().isoformat())
+
+    def sweep_overdue_timers(self, batch_size=500):
+        """Close every user's timers that ran past MAX_TIMER_SECONDS.
+
+        Returns the number of entries closed, or 0 when another sweeper holds
+        the lock.
         """
-        return self.repository.complete_overdue_time_entries(max_duration_seconds)
+        return self.repository.sweep_overdue_time_entries(
+            MAX_TIMER_SECONDS, batch_size=batch_size
+        )
 
     def delete_task(self, task_id):
         self.repository.delete_task(task_id)
 
+    def delete_tasks(self, task_ids):
+        self.repository.delete_tasks(task_ids)
+
     def set_task_daily_check(self, task_id, done):
+        self.set_tasks_daily_check([int(task_id)], done)
+
+    def set_tasks_daily_check(self, task_ids, done):
         log_date = self.current_local_date().isoformat()
-        self.repository.set_task_daily_check(int(task_id), log_date, done)
+        self.repository.set_tasks_daily_check(task_ids, log_date, done)
 
     def list_task_daily_checks(self, task_ids, start_date, end_date):
         if not task_ids:
@@ -1643,14 +1627,18 @@ class TaskService:
         return self.repository.fetch_habit_logs_between(habit_ids, start_iso, end_iso)
 
     def set_task_status(self, task_id, status):
+        self.set_tasks_status([int(task_id)], status)
+
+    def set_tasks_status(self, task_ids, status):
         status = (status or "").strip().lower()
         if status not in {"active", "completed"}:
             return
-        completed_at = datetime.utcnow().isoformat() if status == "completed" else None
-        if status == "completed" and self.repository.is_task_running(task_id):
-            self.repository.stop_task(task_id, datetime.utcnow().isoformat())
-        self.repository.set_task_status(int(task_id), status, completed_at)
+        if status == "completed":
+            self.repository.complete_tasks(task_ids, datetime.utcnow().isoformat())
+        else:
+            self.repository.set_tasks_status(task_ids, status, None)
 
+    @request_memoized
     def list_habits(self, log_date):
         habits = self.repository.fetch_habits()
         if not habits:
@@ -1696,6 +1684,7 @@ class TaskService:
             "focus_window": focus_window,
         }
 
+    @request_memoized
     def habit_completion_series(self, days=14):
         today = self.current_local_date()
         start_date = today - timedelta(days=days - 1)
@@ -0,0 +1,117 @@
+"""Vectorized interval arithmetic for time analytics.
+
+Time entries are loaded into int64 arrays of epoch microseconds, so clipping,
+day-bucket assignment, group-by sums and interval unions run as NumPy array
+operations instead of per-row datetime arithmetic. Results are whole seconds
+computed exactly as the datetime code in report_engine computes them, which
+remains the path used when NumPy is not installed or a batch is too small to
+be worth converting.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # Optional: report_engine falls back to plain Python.
+    np = None
+
+VECTORIZE_MIN_ENTRIES = max(1, int(os.getenv("ANALYTICS_VECTORIZE_MIN_ENTRIES", "1000")))
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_MICROS_PER_SECOND = 1_000_000
+
+
+def should_vectorize(count):
+    return np is not None and count >= VECTORIZE_MIN_ENTRIES
+
+
+def to_micros(value):
+    """Naive UTC datetime to integer epoch microseconds."""
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def interval_arrays(intervals):
+    """Split (start, end) datetime pairs into int64 start and end arrays."""
+    count = len(intervals)
+    starts = np.fromiter((to_micros(start) for start, _ in intervals), np.int64, count)
+    ends = np.fromiter((to_micros(end) for _, end in intervals), np.int64, count)
+    return starts, ends
+
+
+def clip(starts, ends, lower, upper):
+    """Clip intervals to [lower, upper); also returns the mask of non-empty ones."""
+    clipped_starts = np.maximum(starts, lower)
+    clipped_ends = np.minimum(ends, upper)
+    return clipped_starts, clipped_ends, clipped_ends > clipped_starts
+
+
+def whole_seconds(starts, ends):
+    # Durations are positive, so floor division truncates like
+    # int(timedelta.total_seconds()).
+    return (ends - starts) // _MICROS_PER_SECOND
+
+
+def split_by_day(starts, ends, day_starts, day_ends):
+    """Cut intervals at day boundaries.
+
+    day_starts and day_ends are sorted, non-overlapping windows. Returns the
+    entry index, day index and clipped bounds of every non-empty piece, in
+    entry order and then day order.
+    """
+    first = np.searchsorted(day_ends, starts, side="right")
+    stop = np.searchsorted(day_starts, ends, side="left")
+    counts = np.maximum(stop - first, 0)
+    entry_index = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    day_index = first[entry_index] + (np.arange(entry_index.size) - offsets[entry_index])
+    piece_starts = np.maximum(starts[entry_index], day_starts[day_index])
+    piece_ends = np.minimum(ends[entry_index], day_ends[day_index])
+    keep = piece_ends > piece_starts
+    return entry_index[keep], day_index[keep], piece_starts[keep], piece_ends[keep]
+
+
+def union_seconds(starts, ends, groups=None, group_count=1):
+    """Whole seconds covered in each group, counting overlaps within a group once.
+
+    Like merged_interval_seconds, touching intervals merge and every merged run
+    is truncated to whole seconds before runs are added up.
+    """
+    totals = np.zeros(group_count, dtype=np.int64)
+    if starts.size == 0:
+        return totals
+    if groups is None:
+        groups = np.zeros(starts.size, dtype=np.int64)
+    # Shift each group into its own band of the number line, so one sort and
+    # one running maximum cover every group without runs leaking across them.
+    base = starts.min()
+    band = ends.max() - base + 1
+    offsets = groups.astype(np.int64) * band - base
+    order = np.argsort(starts + offsets, kind="stable")
+    run_starts = starts[order] + offsets[order]
+    reach = np.maximum.accumulate(ends[order] + offsets[order])
+    new_run = np.empty(order.size, dtype=bool)
+    new_run[0] = True
+    np.greater(run_starts[1:], reach[:-1], out=new_run[1:])
+    run_first = np.flatnonzero(new_run)
+    run_last = np.append(run_first[1:] - 1, order.size - 1)
+    run_seconds = whole_seconds(run_starts[run_first], reach[run_last])
+    np.add.at(totals, groups[order][run_first], run_seconds)
+    return totals
+
+
+def group_sums(codes, values, group_count):
+    totals = np.zeros(group_count, dtype=np.int64)
+    np.add.at(totals, codes, values)
+    return totals
+
+
+def group_max(codes, values, group_count):
+    totals = np.full(group_count, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(totals, codes, values)
+    return totals
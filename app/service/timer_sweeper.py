@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+import time
+
+import click
+
+logger = logging.getLogger(__name__)
+
+
+class TimerSweeper:
+    """Periodically closes timers that ran past the Pomodoro cap.
+
+    Every worker may run one; the repository's advisory lock lets only one
+    sweep at a time across workers and replicas. Reads already cap open
+    entries, so a late or skipped sweep only delays the write, never changes
+    reported totals.
+    """
+
+    def __init__(self, app, service, interval_seconds=60, batch_size=500):
+        self.app = app
+        self.service = service
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def sweep_once(self):
+        with self.app.app_context():
+            try:
+                closed = self.service.sweep_overdue_timers(batch_size=self.batch_size)
+            except Exception:
+                logger.exception("timer sweep failed")
+                return 0
+        if closed:
+            logger.info("timer sweep closed %s overdue entries", closed)
+        return closed
+
+    def start(self):
+        # Threads do not survive fork, so a worker forked from a process that
+        # already started the sweeper has to start its own.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="timer-sweeper", daemon=True
+            )
+            self._thread.start()
+            self._pid = pid
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.sweep_once()
+
+
+def register_timer_sweeper(app, service):
+    sweeper = TimerSweeper(
+        app,
+        service,
+        interval_seconds=max(5.0, float(os.getenv("TIMER_SWEEP_INTERVAL_SECONDS", "60"))),
+        batch_size=max(1, int(os.getenv("TIMER_SWEEP_BATCH_SIZE", "500"))),
+    )
+
+    if os.getenv("TIMER_SWEEPER_ENABLED", "1") == "1":
+        # Started from the first request rather than here so it runs inside
+        # the serving worker, not in a CLI process or a preloading master.
+        @app.before_request
+        def start_timer_sweeper():
+            sweeper.start()
+
+    @app.cli.command("sweep-timers")
+    @click.option("--loop", is_flag=True, help="Keep sweeping every interval instead of once.")
+    def sweep_timers_command(loop):
+        """Close timers that ran past the Pomodoro cap."""
+        while True:
+            closed = sweeper.sweep_once()
+            click.echo(f"Closed {closed} overdue timers.")
+            if not loop:
+                break
+            time.sleep(sweeper.interval_seconds)
+
+    return sweeper
@@ -7,17 +7,22 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.observability import configure_logging, register_observability
 from app.auth_client import init_auth
+from app.compression import register_response_compression
 
 from app.auth.routes import register_auth_routes
+from app.presentation.json_provider import register_json_provider
 from app.presentation.routes import register_routes
 from app.repository.postgres_repository import PostgresTaskRepository
+from app.service.request_memo import register_request_memo
 from app.service.task_service import TaskService
+from app.service.timer_sweeper import register_timer_sweeper
 
 
 def create_app():
     load_dotenv()
     configure_logging()
     app = Flask(__name__)
+    register_json_provider(app)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret")
     app.config["AUTH_JWT_SECRET"] = os.getenv("AUTH_JWT_SECRET", "dev-jwt-secret")
     app.config["AUTH_COOKIE_NAME"] = os.getenv("AUTH_COOKIE_NAME", "goalixa_auth")
@@ -33,6 +38,8 @@ def create_app():
 
     # Respect Cloudflare/forwarded headers for scheme/host/prefix resolution.
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
+    # Compress large responses in the encoding the client prefers.
+    register_response_compression(app)
 
     register_observability(app)
     init_auth(app)
@@ -46,6 +53,8 @@ def create_app():
     service = TaskService(repository)
 
     register_routes(app, service)
+    register_timer_sweeper(app, service)
+    register_request_memo(app)
     app.teardown_appcontext(repository.close_db)
     with app.app_context():
         service.init_db()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Day Bucketing Benchmark
+
+Compares the previous per-entry scan over every day bucket with the bisect
+lookup in DayBuckets and, when NumPy is installed, the vectorized
+time_analytics engine, on synthetic entries. No database is needed. All
+approaches are checked to produce the same daily totals.
+
+Usage:
+    python scripts/benchmark_day_bucketing.py [--entries-per-day 40] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.service import time_analytics  # noqa: E402
+from app.service.report_engine import DayBuckets, merged_interval_seconds  # noqa: E402
+
+
+def build_days(days):
+    # Fixed +03:30 offset, like the Asia/Tehran default, so buckets do not
+    # start at UTC midnight.
+    first = datetime(2026, 1, 1) - timedelta(hours=3, minutes=30)
+    return [
+        (first + timedelta(days=offset), first + timedelta(days=offset + 1))
+        for offset in range(days)
+    ]
+
+
+def build_entries(days, entries_per_day, seed=7):
+    rng = random.Random(seed)
+    range_start = days[0][0]
+    span_seconds = int((days[-1][1] - range_start).total_seconds())
+    entries = []
+    for _ in range(len(days) * entries_per_day):
+        start = range_start + timedelta(seconds=rng.randrange(span_seconds))
+        # Mostly Pomodoro-sized entries, with a few long ones that cross midnight.
+        minutes = rng.choice((25, 25, 25, 50, 90, 600))
+        entries.append((start, start + timedelta(minutes=minutes)))
+    entries.sort(reverse=True)
+    return entries
+
+
+def bucket_linear(days, entries):
+    intervals = [[] for _ in days]
+    for entry_start, entry_end in entries:
+        for index, (day_start, day_end) in enumerate(days):
+            overlap_start = max(entry_start, day_start)
+            overlap_end = min(entry_end, day_end)
+            if overlap_end > overlap_start:
+                intervals[index].append((overlap_start, overlap_end))
+    return [merged_interval_seconds(day_intervals) for day_intervals in intervals]
+
+
+def bucket_bisect(days, entries):
+    bounds = DayBuckets(days)
+    intervals = [[] for _ in days]
+    for entry_start, entry_end in entries:
+        for index, overlap_start, overlap_end in bounds.overlaps(entry_start, entry_end):
+            intervals[index].append((overlap_start, overlap_end))
+    return [merged_interval_seconds(day_intervals) for day_intervals in intervals]
+
+
+def bucket_vectorized(days, entries):
+    starts, ends = time_analytics.interval_arrays(entries)
+    day_starts, day_ends = time_analytics.interval_arrays(days)
+    _, day_index, piece_starts, piece_ends = time_analytics.split_by_day(
+        starts, ends, day_starts, day_ends
+    )
+    return time_analytics.union_seconds(
+        piece_starts, piece_ends, day_index, len(days)
+    ).tolist()
+
+
+def measure(func, days, entries, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(days, entries)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries-per-day", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    vectorized = time_analytics.np is not None
+    header = f"{'days':>5} {'entries':>8} {'linear ms':>10} {'bisect ms':>10} {'speedup':>8}"
+    if vectorized:
+        header += f" {'numpy ms':>9} {'speedup':>8}"
+    print(header)
+    for day_count in (7, 90, 365):
+        days = build_days(day_count)
+        entries = build_entries(days, args.entries_per_day)
+        linear_ms, linear = measure(bucket_linear, days, entries, args.repeat)
+        bisect_ms, bisected = measure(bucket_bisect, days, entries, args.repeat)
+        if linear != bisected:
+            sys.exit(f"bucket totals differ for {day_count} days")
+        line = (
+            f"{day_count:>5} {len(entries):>8} {linear_ms:>10.1f} {bisect_ms:>10.1f} "
+            f"{linear_ms / bisect_ms:>7.1f}x"
+        )
+        if vectorized:
+            numpy_ms, from_arrays = measure(bucket_vectorized, days, entries, args.repeat)
+            if linear != from_arrays:
+                sys.exit(f"vectorized bucket totals differ for {day_count} days")
+            line += f" {numpy_ms:>9.1f} {linear_ms / numpy_ms:>7.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
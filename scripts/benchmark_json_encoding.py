@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+JSON Encoding Benchmark
+
+Times how long Flask's default JSON provider and the orjson provider take to
+encode the payloads of the biggest API endpoints, and checks that both
+produce the same JSON. Payloads are built once, as the SKIP_AUTH dev user,
+whose account is filled from scripts/demo_seed.sql when it has no tasks, so
+point DATABASE_URL at a scratch database.
+
+Usage:
+    python scripts/benchmark_json_encoding.py [--repeat 200]
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (required)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    "/api/tasks",
+    "/api/timer/dashboard",
+    "/api/goals",
+    "/api/reports/summary",
+    "/api/reminders",
+]
+
+
+def seed_demo_data(database_url):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        if conn.execute("SELECT 1 FROM tasks WHERE user_id = 1 LIMIT 1").fetchone():
+            return
+        with open(os.path.join(root, "scripts", "demo_seed.sql"), encoding="utf-8") as handle:
+            conn.execute(handle.read().replace("{{user_id}}", "1"))
+
+
+def capture_payloads(app, client):
+    """The object each endpoint passes to jsonify, keyed by path."""
+    captured = {}
+    response = app.json.response
+
+    def capturing_response(*args, **kwargs):
+        captured["payload"] = app.json._prepare_response_obj(args, kwargs)
+        return response(*args, **kwargs)
+
+    app.json.response = capturing_response
+    payloads = {}
+    try:
+        for path in ENDPOINTS:
+            captured.clear()
+            if client.get(path).status_code != 200 or "payload" not in captured:
+                sys.exit(f"{path} did not return a JSON payload")
+            payloads[path] = captured["payload"]
+    finally:
+        del app.json.response
+    return payloads
+
+
+def measure(provider, payload, repeat):
+    timings = []
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = provider.response(payload).get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL must be set")
+    os.environ["SKIP_AUTH"] = "1"
+    os.environ["LOG_REQUESTS_ENABLED"] = "0"
+    os.environ["TIMER_SWEEPER_ENABLED"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import main as app_module
+    from app.presentation.json_provider import FragmentJSONProvider, OrjsonProvider, orjson
+
+    if orjson is None:
+        sys.exit("orjson is not installed")
+    app = app_module.app
+    client = app.test_client()
+    # Creates the dev user's account before the demo data references it.
+    client.get("/api/labels")
+    seed_demo_data(database_url)
+    with app.test_request_context():
+        payloads = capture_payloads(app, client)
+        default_provider = FragmentJSONProvider(app)
+        orjson_provider = OrjsonProvider(app)
+        print(f"{'endpoint':<24} {'bytes':>8} {'default ms':>11} {'orjson ms':>10} {'speedup':>8}")
+        for path, payload in payloads.items():
+            default_ms, default_body = measure(default_provider, payload, args.repeat)
+            orjson_ms, orjson_body = measure(orjson_provider, payload, args.repeat)
+            if json.loads(default_body) != json.loads(orjson_body):
+                sys.exit(f"{path}: providers produce different JSON")
+            print(
+                f"{path:<24} {len(orjson_body):>8} {default_ms:>11.3f} {orjson_ms:>10.3f} "
+                f"{default_ms / orjson_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Database Round Trip Benchmark
+
+Counts the network round trips each API endpoint makes to PostgreSQL with
+pipelined hydration turned off (one round trip per query, as before) and on.
+Statements run outside a pipeline, commits and rollbacks count one each; a
+whole pipeline block counts once. Requests run as the SKIP_AUTH dev user,
+whose account is filled from scripts/demo_seed.sql when it has no tasks, so
+point DATABASE_URL at a scratch database.
+
+Usage:
+    python scripts/benchmark_round_trips.py [--repeat 5]
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (required)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    "/api/tasks",
+    "/api/projects",
+    "/api/timer/dashboard",
+    "/api/calendar/board",
+    "/api/goals",
+    "/api/planner",
+]
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        counter = self
+        execute = psycopg.Connection.execute
+        commit = psycopg.Connection.commit
+        rollback = psycopg.Connection.rollback
+        pipeline = psycopg.Connection.pipeline
+
+        def counted_execute(conn, *args, **kwargs):
+            if getattr(conn, "_pipeline", None) is None:
+                counter.count += 1
+            return execute(conn, *args, **kwargs)
+
+        def counted_commit(conn):
+            counter.count += 1
+            return commit(conn)
+
+        def counted_rollback(conn):
+            counter.count += 1
+            return rollback(conn)
+
+        @contextmanager
+        def counted_pipeline(conn):
+            counter.count += 1
+            with pipeline(conn) as block:
+                yield block
+
+        psycopg.Connection.execute = counted_execute
+        psycopg.Connection.commit = counted_commit
+        psycopg.Connection.rollback = counted_rollback
+        psycopg.Connection.pipeline = counted_pipeline
+
+
+def seed_demo_data(database_url):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        if conn.execute("SELECT 1 FROM tasks WHERE user_id = 1 LIMIT 1").fetchone():
+            return
+        with open(os.path.join(root, "scripts", "demo_seed.sql"), encoding="utf-8") as handle:
+            conn.execute(handle.read().replace("{{user_id}}", "1"))
+
+
+def measure(client, counter, path, repeat):
+    trips = []
+    timings = []
+    for _ in range(repeat):
+        counter.count = 0
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            sys.exit(f"{path} returned {response.status_code}")
+        trips.append(counter.count)
+    return statistics.median(trips), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL must be set")
+    os.environ["SKIP_AUTH"] = "1"
+    os.environ["LOG_REQUESTS_ENABLED"] = "0"
+    os.environ["TIMER_SWEEPER_ENABLED"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    # The module-level app is the "before" build; the second one pipelines.
+    os.environ["DB_PIPELINE_ENABLED"] = "0"
+    import main as app_module
+
+    sequential_client = app_module.app.test_client()
+    os.environ["DB_PIPELINE_ENABLED"] = "1"
+    pipelined_client = app_module.create_app().test_client()
+
+    # Creates the dev user's account before the demo data references it.
+    sequential_client.get("/api/labels")
+    seed_demo_data(database_url)
+
+    counter = RoundTripCounter()
+    counter.install()
+    print(f"{'endpoint':<24} {'before':>7} {'after':>6} {'before ms':>10} {'after ms':>9}")
+    for path in ENDPOINTS:
+        # Warm both apps so one-off setup queries are not counted.
+        sequential_client.get(path)
+        pipelined_client.get(path)
+        before_trips, before_ms = measure(sequential_client, counter, path, args.repeat)
+        after_trips, after_ms = measure(pipelined_client, counter, path, args.repeat)
+        print(
+            f"{path:<24} {before_trips:>7.0f} {after_trips:>6.0f} "
+            f"{before_ms:>10.1f} {after_ms:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Time Entry Range Query Benchmark
+
+Compares the legacy ``started_at < end AND (ended_at IS NULL OR ended_at > start)``
+window predicate on its own against the one that adds the GiST range overlap.
+PostgresTaskRepository uses the latter only for windows that ended more than
+TIME_ENTRY_RECENT_WINDOW_DAYS ago; the predicate it would pick is marked with
+a ``*``. Data lives in temporary tables, so nothing is written to the
+application schema.
+
+Usage:
+    python scripts/benchmark_time_entry_ranges.py [--entries 120000] [--users 3]
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (required)
+    TIME_ENTRY_RECENT_WINDOW_DAYS: see README (default 30)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+from psycopg.rows import dict_row
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.repository.postgres_repository import (  # noqa: E402
+    TIME_ENTRY_RANGE_SQL,
+    _time_entry_overlap_params,
+    _time_entry_overlap_sql,
+)
+
+LEGACY_QUERY = """
+    SELECT id, task_id, started_at, ended_at
+    FROM {table}
+    WHERE user_id = %s
+      AND started_at < %s::timestamptz
+      AND (ended_at IS NULL OR ended_at > %s::timestamptz)
+"""
+
+RANGE_QUERY = """
+    SELECT id, task_id, started_at, ended_at
+    FROM {table}
+    WHERE user_id = %s
+      AND {overlap}
+"""
+
+
+def build_table(db, table, users, entries_per_user, span_days):
+    db.execute(
+        f"""
+        CREATE TEMP TABLE {table} (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            started_at TIMESTAMPTZ NOT NULL,
+            ended_at TIMESTAMPTZ
+        )
+        """
+    )
+    # Entries are spread evenly over span_days and last 25 minutes; the newest
+    # entry for each user is left running.
+    db.execute(
+        f"""
+        INSERT INTO {table} (user_id, task_id, started_at, ended_at)
+        SELECT u, (n %% 40) + 1, ts, CASE WHEN n = %s THEN NULL ELSE ts + INTERVAL '25 minutes' END
+        FROM generate_series(1, %s) AS u
+        CROSS JOIN generate_series(1, %s) AS n
+        CROSS JOIN LATERAL (
+            SELECT NOW() - make_interval(secs => (%s - n) * (%s * 86400.0 / %s)) AS ts
+        ) AS stamp
+        """,
+        (entries_per_user, users, entries_per_user, entries_per_user, span_days, entries_per_user),
+    )
+    # A few zero-length entries, whose empty range the overlap alone misses;
+    # both predicates must return them.
+    db.execute(f"UPDATE {table} SET ended_at = started_at WHERE id % 1000 = 0")
+    db.execute(f"CREATE INDEX ON {table} (user_id)")
+    db.execute(f"CREATE INDEX ON {table} (started_at)")
+    db.execute(f"CREATE INDEX ON {table} (ended_at)")
+    db.execute(f"ANALYZE {table}")
+
+
+def add_range_index(db, table):
+    range_sql = TIME_ENTRY_RANGE_SQL.format(p="")
+    try:
+        with db.transaction():
+            db.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        columns = f"user_id, {range_sql}"
+        label = "gist (user_id, tstzrange)"
+    except psycopg.Error:
+        columns = range_sql
+        label = "gist (tstzrange) [btree_gist unavailable]"
+    db.execute(f"CREATE INDEX ON {table} USING gist ({columns})")
+    db.execute(f"CREATE INDEX ON {table} (user_id) WHERE ended_at <= started_at")
+    db.execute(f"ANALYZE {table}")
+    return label
+
+
+def explain(db, query, params, repeat):
+    timings = []
+    plan = None
+    for _ in range(repeat):
+        row = db.execute(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params
+        ).fetchone()
+        plan = row["QUERY PLAN"][0]
+        timings.append(plan["Execution Time"])
+    root = plan["Plan"]
+    return {
+        "ms": statistics.median(timings),
+        "rows": root.get("Actual Rows", 0),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0)
+        + root.get("Local Hit Blocks", 0) + root.get("Local Read Blocks", 0),
+        "node": _describe(root),
+    }
+
+
+def _describe(node):
+    parts = [node["Node Type"]]
+    if node.get("Index Name"):
+        parts.append(node["Index Name"])
+    for child in node.get("Plans", []):
+        parts.append("<- " + _describe(child))
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=120000, help="entries per user")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--span-days", type=int, default=5 * 365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL is required")
+
+    recent_window_days = max(0, int(os.getenv("TIME_ENTRY_RECENT_WINDOW_DAYS", "30")))
+
+    with psycopg.connect(database_url, row_factory=dict_row) as db:
+        db.execute("SET TIME ZONE 'UTC'")
+        legacy_table = "bench_time_entries_legacy"
+        range_table = "bench_time_entries_range"
+        build_table(db, legacy_table, args.users, args.entries, args.span_days)
+        build_table(db, range_table, args.users, args.entries, args.span_days)
+        index_label = add_range_index(db, range_table)
+
+        print(
+            f"{args.users} users x {args.entries} entries over {args.span_days} days; "
+            f"range index: {index_label}"
+        )
+        print(f"{'window':>14} {'query':>7} {'rows':>6} {'buffers':>8} {'ms':>9}  plan")
+        now = datetime.now(timezone.utc)
+        # (window length, days before now that the window ends); historical
+        # windows are where the legacy predicate loses selectivity.
+        windows = ((1, 0), (7, 0), (30, 0), (365, 0), (7, 30), (7, 90), (7, 180), (7, 365), (30, 730))
+        for days, ago in windows:
+            window_end = now - timedelta(days=ago)
+            start = (window_end - timedelta(days=days)).isoformat()
+            end = window_end.isoformat()
+            legacy = explain(
+                db,
+                LEGACY_QUERY.format(table=legacy_table),
+                (1, end, start),
+                args.repeat,
+            )
+            ranged = explain(
+                db,
+                RANGE_QUERY.format(table=range_table, overlap=_time_entry_overlap_sql()),
+                (1, *_time_entry_overlap_params(start, end)),
+                args.repeat,
+            )
+            picked = "range" if ago > recent_window_days else "legacy"
+            for name, result in (("legacy", legacy), ("range", ranged)):
+                name = f"*{name}" if name == picked else name
+                print(
+                    f"{f'{days}d @-{ago}d':>14} {name:>7} {result['rows']:>6} {result['buffers']:>8} "
+                    f"{result['ms']:>9.2f}  {result['node']}"
+                )
+        db.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Task Payload Parity Check
+
+Fetches the task list payload from both TASKS_PAYLOAD_ENGINE builds (the
+Python serializer and the JSON assembled by Postgres) for the SKIP_AUTH dev
+user and exits non-zero if they differ. The account is filled from
+scripts/demo_seed.sql when it has no tasks, so point DATABASE_URL at a
+scratch database.
+
+Usage:
+    python scripts/check_tasks_payload_parity.py
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (required)
+"""
+
+import json
+import os
+import sys
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed_demo_data(database_url):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        if conn.execute("SELECT 1 FROM tasks WHERE user_id = 1 LIMIT 1").fetchone():
+            return
+        with open(os.path.join(root, "scripts", "demo_seed.sql"), encoding="utf-8") as handle:
+            conn.execute(handle.read().replace("{{user_id}}", "1"))
+
+
+def first_difference(python_value, postgres_value, path="$"):
+    if type(python_value) is not type(postgres_value):
+        return f"{path}: {python_value!r} != {postgres_value!r}"
+    if isinstance(python_value, dict):
+        for key in sorted(set(python_value) | set(postgres_value)):
+            if key not in python_value or key not in postgres_value:
+                return f"{path}.{key}: missing on one side"
+            found = first_difference(python_value[key], postgres_value[key], f"{path}.{key}")
+            if found:
+                return found
+        return None
+    if isinstance(python_value, list):
+        if len(python_value) != len(postgres_value):
+            return f"{path}: {len(python_value)} items != {len(postgres_value)} items"
+        for index, (left, right) in enumerate(zip(python_value, postgres_value)):
+            found = first_difference(left, right, f"{path}[{index}]")
+            if found:
+                return found
+        return None
+    if python_value != postgres_value:
+        return f"{path}: {python_value!r} != {postgres_value!r}"
+    return None
+
+
+def main():
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL must be set")
+    os.environ["SKIP_AUTH"] = "1"
+    os.environ["LOG_REQUESTS_ENABLED"] = "0"
+    os.environ["TIMER_SWEEPER_ENABLED"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import main as app_module
+    from app.presentation import routes
+
+    client = app_module.app.test_client()
+    # Creates the dev user's account before the demo data references it.
+    client.get("/api/labels")
+    seed_demo_data(database_url)
+
+    payloads = {}
+    for engine in ("python", "postgres"):
+        routes.TASKS_PAYLOAD_ENGINE = engine
+        response = client.get("/api/tasks")
+        if response.status_code != 200:
+            sys.exit(f"{engine} engine returned {response.status_code}")
+        payloads[engine] = json.loads(response.get_data(as_text=True))
+
+    difference = first_difference(payloads["python"], payloads["postgres"])
+    if difference:
+        sys.exit(f"payloads differ at {difference}")
+    counts = ", ".join(f"{key}={len(value)}" for key, value in sorted(payloads["python"].items()))
+    print(f"payloads match ({counts})")
+
+
+if __name__ == "__main__":
+    main()